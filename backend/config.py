@@ -15,6 +15,41 @@ DATABASE_NAME = os.getenv("DATABASE_NAME", "skill_sync")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 SERPAPI_API_KEY = os.getenv("SERPAPI_API_KEY")
 
+# Orphaned upload garbage collection (utils/upload_gc.py)
+UPLOAD_GC_INTERVAL_SECONDS = int(os.getenv("UPLOAD_GC_INTERVAL_SECONDS", 6 * 60 * 60))  # 0 = off
+UPLOAD_GC_GRACE_SECONDS = int(os.getenv("UPLOAD_GC_GRACE_SECONDS", 60 * 60))
+UPLOAD_GC_MAX_DELETES_PER_SECOND = float(os.getenv("UPLOAD_GC_MAX_DELETES_PER_SECOND", 20))
+
+# Team chat WebSockets (utils/chat_hub.py)
+CHAT_BROKER_URL = os.getenv("CHAT_BROKER_URL", "")  # "" = single process
+CHAT_SUBSCRIBER_QUEUE_SIZE = int(os.getenv("CHAT_SUBSCRIBER_QUEUE_SIZE", 100))
+
+# Team chat storage (utils/chat_store.py): "messages" or "buckets"
+CHAT_STORAGE = os.getenv("CHAT_STORAGE", "messages")
+CHAT_BUCKET_WINDOW_HOURS = int(os.getenv("CHAT_BUCKET_WINDOW_HOURS", 24))
+CHAT_BUCKET_MAX_MESSAGES = int(os.getenv("CHAT_BUCKET_MAX_MESSAGES", 200))
+CHAT_BUCKET_MAX_BYTES = int(os.getenv("CHAT_BUCKET_MAX_BYTES", 1024 * 1024))  # well under Mongo's 16 MB
+
+# LLM gateway (utils/llm_gateway.py): "gemini" or "stub" for offline/load tests
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
+LLM_MODEL = os.getenv("LLM_MODEL", "gemini-2.5-flash")
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", 30))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 8))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 2))
+LLM_STUB_LATENCY = os.getenv("LLM_STUB_LATENCY", "lognormal:300,0.4")  # see utils/llm_stub.py
+LLM_STUB_ERROR_RATE = float(os.getenv("LLM_STUB_ERROR_RATE", 0))
+LLM_STUB_SEED = int(os.getenv("LLM_STUB_SEED", 42))
+LLM_CACHE_MEMORY_ITEMS = int(os.getenv("LLM_CACHE_MEMORY_ITEMS", 1000))  # 0 = Mongo only
+
+# Community post enrichment (utils/community_enrichment.py)
+COMMUNITY_ENRICH_BATCH_SIZE = int(os.getenv("COMMUNITY_ENRICH_BATCH_SIZE", 20))
+COMMUNITY_ENRICH_WAIT_SECONDS = float(os.getenv("COMMUNITY_ENRICH_WAIT_SECONDS", 2))
+COMMUNITY_ENRICH_SWEEP_SECONDS = int(os.getenv("COMMUNITY_ENRICH_SWEEP_SECONDS", 10 * 60))
+COMMUNITY_FEED_CACHE_SECONDS = float(os.getenv("COMMUNITY_FEED_CACHE_SECONDS", 10))
+
+# Career coach insights are reused until the profile changes or they get this old
+CAREER_INSIGHTS_MAX_AGE_HOURS = float(os.getenv("CAREER_INSIGHTS_MAX_AGE_HOURS", 24 * 7))
+
 JWT_ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
 
@@ -1,4 +1,5 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import OperationFailure
 import os
 
 # =========================
@@ -32,8 +33,13 @@ mentorship_sessions_collection = db.get_collection("mentorship_sessions")
 # Gamification & Communication
 # =========================
 chat_messages_collection = db.get_collection("chat_messages")
+chat_buckets_collection = db.get_collection("chat_buckets")
+chat_read_state_collection = db.get_collection("chat_read_state")
 career_coach_collection = db.get_collection("career_coach_insights")
 community_collection = db.get_collection("community_posts")
+community_replies_collection = db.get_collection("community_replies")
+notifications_collection = db.get_collection("notifications")
+llm_cache_collection = db.get_collection("llm_cache")
 
 # =========================
 # Analytics
@@ -54,6 +60,8 @@ skill_gaps_collection = db.get_collection("skill_gaps")
 # Files & Submissions
 # =========================
 team_files_collection = db.get_collection("files")
+blobs_collection = db.get_collection("blobs")
+file_texts_collection = db.get_collection("file_texts")
 submissions_collection = db.get_collection("submissions")
 peer_reviews_collection = db.get_collection("peer_reviews")
 plagiarism_collection = db.get_collection("plagiarism_reports")
@@ -64,3 +72,66 @@ plagiarism_collection = db.get_collection("plagiarism_reports")
 mentor_collab_collection = db.get_collection("mentor_collaboration_posts")
 announcements_collection = db.get_collection("mentor_announcements")
 peer_appreciations_collection = db.get_collection("peer_appreciations")
+
+# =========================
+# Indexes (created at startup)
+# =========================
+async def ensure_indexes():
+    try:
+        await submissions_collection.create_index(
+            [("team_id", 1), ("version", 1)], unique=True, name="team_version_unique"
+        )
+    except OperationFailure as e:
+        # pre-existing duplicate versions from the old read-then-insert race
+        print("Could not create unique (team_id, version) index:", e)
+
+    await submissions_collection.create_index(
+        [("team_id", 1), ("idempotency_key", 1)],
+        unique=True,
+        partialFilterExpression={"idempotency_key": {"$exists": True}},
+        name="team_idempotency_key_unique"
+    )
+
+    await chat_messages_collection.create_index(
+        [("team_id", 1), ("timestamp", 1), ("_id", 1)], name="team_timestamp_id"
+    )
+    await chat_messages_collection.create_index([("team_id", 1), ("text", "text")], name="team_text")
+    await chat_buckets_collection.create_index(
+        [("team_id", 1), ("window", 1), ("count", 1)], name="team_window_count"
+    )
+    await chat_buckets_collection.create_index([("team_id", 1), ("end", -1)], name="team_end")
+    await chat_buckets_collection.create_index([("team_id", 1), ("start", 1)], name="team_start")
+    await chat_buckets_collection.create_index(
+        [("team_id", 1), ("messages.text", "text")], name="team_messages_text"
+    )
+    await chat_read_state_collection.create_index(
+        [("user_id", 1), ("team_id", 1)], unique=True, name="user_team_unique"
+    )
+
+    # entries carry their own expiry (per-endpoint freshness policy)
+    await llm_cache_collection.create_index("expires_at", expireAfterSeconds=0, name="expires_at_ttl")
+
+    await community_collection.create_index([("created_at", -1), ("_id", -1)], name="created_at_id")
+    await community_replies_collection.create_index(
+        [("post_id", 1), ("created_at", 1), ("_id", 1)], name="post_created_at_id"
+    )
+
+    await notifications_collection.create_index(
+        [("user_id", 1), ("created_at", -1), ("_id", -1)], name="user_created_at_id"
+    )
+    await notifications_collection.create_index(
+        [("user_id", 1)], partialFilterExpression={"read": False}, name="user_unread"
+    )
+    await notifications_collection.create_index(
+        "dedupe_key", unique=True,
+        partialFilterExpression={"dedupe_key": {"$exists": True}}, name="dedupe_key_unique"
+    )
+    # the inbox only keeps the last 90 days
+    await notifications_collection.create_index(
+        "created_at", expireAfterSeconds=90 * 24 * 60 * 60, name="created_at_ttl"
+    )
+
+    await career_coach_collection.create_index([("user_id", 1), ("timestamp", -1)], name="user_timestamp")
+
+    # blob_store removal worker checks whether a path is still in use
+    await blobs_collection.create_index("path", name="path")
@@ -1,6 +1,6 @@
-from fastapi import FastAPI
+import asyncio
+from fastapi import FastAPI, Depends, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 
 from routes import (
     auth_routes,
@@ -23,12 +23,22 @@ from routes import (
     mentor_research,
     mentor_collab,
     mentor_announcements,
+    uploads_routes,
+    notification_routes,
 )
+from database import ensure_indexes
+from routes.team_routes.submissions import backfill_submission_counters
+from routes.user_routes import get_current_user
+from utils.blob_store import removal_worker
+from utils.chat_hub import hub
+from utils.community_enrichment import enrichment_worker, enrichment_sweeper
+from utils.llm_gateway import metrics_snapshot
+from utils.upload_gc import upload_gc_loop
 
 app = FastAPI()
 
-# 🔥 THIS LINE WAS MISSING
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+# Signed, cache-friendly /uploads serving (ranges, precompressed variants)
+app.include_router(uploads_routes.router)
 
 # --- CORS ---
 origins = [
@@ -52,6 +62,7 @@ app.include_router(team_routes.router, prefix="/api/team")
 app.include_router(skill_routes.router, prefix="/api/skills")
 app.include_router(dashboard_routes.router, prefix="/api/dashboard")
 app.include_router(team_chat_routes.router)
+app.include_router(team_chat_routes.ws_router)
 app.include_router(mentor_routes.router, prefix="/api")
 app.include_router(team_files_routes.router, prefix="/api")
 app.include_router(ai_learning_routes.router)
@@ -65,7 +76,31 @@ app.include_router(future_self_routes.router)
 app.include_router(mentor_research.router)
 app.include_router(mentor_collab.router)
 app.include_router(mentor_announcements.router)
+app.include_router(notification_routes.router)
+
+# --- Startup ---
+@app.on_event("startup")
+async def prepare_database():
+    await ensure_indexes()
+    await backfill_submission_counters()
+    await hub.start()
+
+@app.on_event("startup")
+async def start_background_jobs():
+    app.state.background_tasks = [
+        asyncio.create_task(removal_worker()),
+        asyncio.create_task(upload_gc_loop()),
+        asyncio.create_task(enrichment_worker()),
+        asyncio.create_task(enrichment_sweeper()),
+    ]
 
 @app.get("/")
 async def root():
     return {"message": "SkillSync Backend Running"}
+
+@app.get("/api/llm/metrics")
+async def llm_metrics(user=Depends(get_current_user)):
+    # per-route traffic and error rates are operational data
+    if user.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Admins only")
+    return metrics_snapshot()
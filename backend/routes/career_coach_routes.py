@@ -2,19 +2,33 @@ from fastapi import APIRouter, Depends, HTTPException
 from bson import ObjectId
 from database import users_collection, career_coach_collection
 from routes.user_routes import get_current_user
-from datetime import datetime
-import google.generativeai as genai
-import os
+from datetime import datetime, timedelta
+import hashlib
+import json
+from config import CAREER_INSIGHTS_MAX_AGE_HOURS
+from utils.llm_gateway import generate
 
 router = APIRouter(prefix="/api/careercoach", tags=["Career Coach"])
 
-# ------------------ Configure Gemini ------------------
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-model = genai.GenerativeModel("gemini-2.5-flash")
+
+def profile_hash(name, skills, interests, goals, experience) -> str:
+    """Stable hash of everything that goes into the insights prompt"""
+    profile = {
+        "name": name,
+        "skills": skills,
+        "interests": interests,
+        "goals": goals,
+        "experience": experience,
+    }
+    raw = json.dumps(profile, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
 
 # ---------------------- Generate Career Insights ----------------------
 @router.get("/insights")
-async def get_career_insights(current_user: dict = Depends(get_current_user)):
+async def get_career_insights(refresh: bool = False, current_user: dict = Depends(get_current_user)):
+    """Latest insight while the profile is unchanged and it is younger than
+    CAREER_INSIGHTS_MAX_AGE_HOURS; otherwise (or with ?refresh=true) a new one"""
     user_id = current_user["_id"]
     user = await users_collection.find_one({"_id": ObjectId(user_id)})
 
@@ -26,6 +40,25 @@ async def get_career_insights(current_user: dict = Depends(get_current_user)):
     interests = user.get("interests", ["AI", "Web Development"])
     goals = user.get("goals", "Exploring career options")
     experience = user.get("experience", "Beginner")
+    fingerprint = profile_hash(name, skills, interests, goals, experience)
+
+    if not refresh:
+        latest = await career_coach_collection.find_one(
+            {"user_id": str(user_id)}, sort=[("timestamp", -1)]
+        )
+        max_age = timedelta(hours=CAREER_INSIGHTS_MAX_AGE_HOURS)
+        if (
+            latest
+            and latest.get("profile_hash") == fingerprint
+            and datetime.utcnow() - latest["timestamp"] < max_age
+        ):
+            return {
+                "user_name": name,
+                "ai_message": latest["ai_message"],
+                "readiness_score": latest["readiness_score"],
+                "timestamp": latest["timestamp"],
+                "cached": True,
+            }
 
     prompt = f"""
 You are a friendly and realistic AI Career Coach.
@@ -58,8 +91,8 @@ Respond ONLY in this format:
 """
 
     try:
-        result = model.generate_content(prompt)
-        ai_message = result.text.strip()
+        # an explicit refresh must not be answered from the prompt cache either
+        ai_message = (await generate(prompt, route="career.insights", use_cache=not refresh)).strip()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Gemini error: {str(e)}")
 
@@ -72,6 +105,8 @@ Respond ONLY in this format:
         "skills": skills,
         "interests": interests,
         "goals": goals,
+        "experience": experience,
+        "profile_hash": fingerprint,
         "ai_message": ai_message,
         "readiness_score": readiness_score,
     }
@@ -83,6 +118,7 @@ Respond ONLY in this format:
         "ai_message": ai_message,
         "readiness_score": readiness_score,
         "timestamp": insight_entry["timestamp"],
+        "cached": False,
     }
 
 
@@ -1,75 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from motor.motor_asyncio import AsyncIOMotorClient
 from datetime import datetime
 from bson import ObjectId
-import google.generativeai as genai
-import os
+from pymongo import ReturnDocument
 import requests
-from database import community_collection
-from fastapi.encoders import jsonable_encoder
+from database import community_collection, community_replies_collection, notifications_collection
 
-from routes.user_routes import get_current_user
-
-# ---------------- CONFIG ----------------
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-model = genai.GenerativeModel("gemini-2.5-flash")
+from routes.user_routes import get_current_user, get_optional_user
+from utils.cursors import encode_cursor, decode_cursor, keyset_filter
+from utils.llm_gateway import generate
+from utils.community_enrichment import enqueue_post, enqueue_reply
+from utils.community_replies import PREVIEW_SIZE, add_reply
+from utils.notifications import notify, notify_once, serialize_notification
+from utils.feed_cache import public_feed, etag_matches
 
 
 router = APIRouter(prefix="/api/community", tags=["Community AI"])
 
-# ---------------- AI HELPERS ----------------
-
-async def ai_moderate(text: str):
-    prompt = f"""
-    Check the following content for toxicity, abuse, hate, or unsafe language.
-    Respond only with SAFE or UNSAFE.
-
-    Content:
-    {text}
-    """
-    response = model.generate_content(prompt)
-    return "UNSAFE" not in response.text.upper()
-
-
-async def ai_auto_tags(text: str):
-    prompt = f"""
-    Extract 3 to 5 relevant technical or professional tags
-    (skills, roles, technologies) from the text.
-    Return as comma-separated values.
-
-    Text:
-    {text}
-    """
-    response = model.generate_content(prompt)
-    return [t.strip() for t in response.text.split(",") if t.strip()]
-
-
-async def ai_summary_and_sentiment(text: str):
-    prompt = f"""
-    Summarize the following text in one sentence.
-    Then classify sentiment as Positive, Neutral, or Needs Improvement.
-
-    Format:
-    Summary: <text>
-    Sentiment: <one word>
-
-    Text:
-    {text}
-    """
-    response = model.generate_content(prompt)
-    lines = response.text.splitlines()
-
-    summary = ""
-    sentiment = "Neutral"
-
-    for l in lines:
-        if l.lower().startswith("summary"):
-            summary = l.split(":", 1)[1].strip()
-        if l.lower().startswith("sentiment"):
-            sentiment = l.split(":", 1)[1].strip()
-
-    return summary, sentiment
-
+FEED_PAGE_SIZE = 20
+FEED_MAX_PAGE_SIZE = 50
+FEED_REPLY_PREVIEW = PREVIEW_SIZE
+REPLIES_PAGE_SIZE = 20
 
 
 @router.post("/post")
@@ -85,18 +36,22 @@ async def create_post(data: dict, user=Depends(get_current_user)):
         "author_role": user.get("role", "student"),
         "tags": [],
         "likes": [],
-        "replies": [],
+        "like_count": 0,
+        "reply_count": 0,
+        "recent_replies": [],
         "created_at": datetime.utcnow()
     }
 
-    await community_collection.insert_one(post)
+    result = await community_collection.insert_one(post)
+    # tags / moderation / sentiment are filled in by the background pipeline
+    enqueue_post(result.inserted_id, content)
+    public_feed.invalidate()
     return {"message": "Post created successfully"}
 
 # -------------------------------
 # GET ALL POSTS (PUBLIC FEED)
 # -------------------------------
-@router.get("/posts")
-async def get_posts():
+async def build_public_feed():
     posts = await community_collection.find().sort(
         "created_at", -1
     ).to_list(100)
@@ -111,7 +66,7 @@ async def get_posts():
 
         # ---- normalize replies ----
         replies = []
-        for r in post.get("replies", []):
+        for r in post.get("recent_replies", post.get("replies", [])):
             replies.append({
                 "_id": str(r.get("_id")),
                 "author_name": r.get("author_name", "Anonymous"),
@@ -126,15 +81,110 @@ async def get_posts():
             "author_name": post.get("author_name", "Anonymous"),
             "author_role": post.get("author_role", "student"),
             "tags": [str(t) for t in post.get("tags", [])],
+            "summary": post.get("summary"),
+            "sentiment": post.get("sentiment"),
+            "flagged": post.get("moderation", {}).get("safe") is False,
             "likes": [str(uid) for uid in likes_raw],
             "replies": replies,
+            "reply_count": post.get("reply_count", len(replies)),
             "created_at": post.get("created_at")
         }
 
-        safe_posts.append(jsonable_encoder(safe_post))
+        safe_posts.append(safe_post)
 
     return safe_posts
 
+
+@router.get("/posts")
+async def get_posts(request: Request):
+    # same bytes for every viewer → serve the shared copy, 304 when unchanged
+    body, etag = await public_feed.get(build_public_feed)
+    headers = {"ETag": etag, "Cache-Control": "public, no-cache"}
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+# -------------------------------
+# PAGINATED FEED (bounded payload)
+# -------------------------------
+def serialize_reply(r: dict) -> dict:
+    return {
+        "_id": str(r.get("_id")),
+        "author_name": r.get("author_name", "Anonymous"),
+        "author_role": r.get("author_role", "Student"),
+        "content": r.get("content", ""),
+        "created_at": r.get("created_at"),
+    }
+
+
+@router.get("/feed")
+async def get_feed(
+    cursor: str = None,
+    limit: int = Query(FEED_PAGE_SIZE, ge=1, le=FEED_MAX_PAGE_SIZE),
+    replies: int = Query(FEED_REPLY_PREVIEW, ge=0, le=PREVIEW_SIZE),
+    user=Depends(get_optional_user),
+):
+    """Newest first; pass next_cursor back as ?cursor= for the next page.
+
+    Likers and replies never leave the database in bulk: counts, the
+    caller's own like and the latest `replies` replies are projected.
+    """
+    match = keyset_filter("created_at", decode_cursor(cursor), "$lt") if cursor else {}
+    uid = str(user["_id"]) if user else None
+
+    pipeline = [
+        {"$match": match},
+        {"$sort": {"created_at": -1, "_id": -1}},
+        {"$limit": limit + 1},
+        {"$project": {
+            "content": 1,
+            "author_name": 1,
+            "author_role": 1,
+            "tags": 1,
+            "summary": 1,
+            "sentiment": 1,
+            "created_at": 1,
+            "flagged": {"$eq": ["$moderation.safe", False]},
+            "like_count": {"$ifNull": ["$like_count", {"$size": {"$ifNull": ["$likes", []]}}]},
+            "liked_by_me": {"$in": [uid, {"$ifNull": ["$likes", []]}]},
+            # replies embedded in posts not migrated yet count too
+            "reply_count": {"$ifNull": ["$reply_count", {"$size": {"$ifNull": ["$replies", []]}}]},
+            "replies": {"$slice": [
+                {"$ifNull": ["$recent_replies", {"$ifNull": ["$replies", []]}]}, -replies
+            ]} if replies else [],
+        }},
+    ]
+    posts = await community_collection.aggregate(pipeline).to_list(limit + 1)
+
+    has_more = len(posts) > limit
+    posts = posts[:limit]
+
+    items = []
+    for post in posts:
+        items.append({
+            "_id": str(post["_id"]),
+            "content": post.get("content", ""),
+            "author_name": post.get("author_name", "Anonymous"),
+            "author_role": post.get("author_role", "student"),
+            "tags": [str(t) for t in post.get("tags", [])],
+            "summary": post.get("summary"),
+            "sentiment": post.get("sentiment"),
+            "flagged": post["flagged"],
+            "like_count": post["like_count"],
+            "liked_by_me": bool(uid) and post["liked_by_me"],
+            "reply_count": post["reply_count"],
+            "replies": [serialize_reply(r) for r in post.get("replies", [])],
+            "created_at": post.get("created_at"),
+        })
+
+    last = posts[-1] if posts else None
+    return {
+        "posts": items,
+        "has_more": has_more,
+        "next_cursor": encode_cursor(last.get("created_at"), last["_id"]) if has_more else None,
+    }
+
 # ---------------- ADD REPLY ----------------
 @router.post("/reply/{post_id}")
 async def reply_to_post(
@@ -148,7 +198,7 @@ async def reply_to_post(
 
     try:
         post = await community_collection.find_one(
-            {"_id": ObjectId(post_id)}
+            {"_id": ObjectId(post_id)}, {"author_id": 1}
         )
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid post ID")
@@ -165,9 +215,12 @@ async def reply_to_post(
         "created_at": datetime.utcnow()
     }
 
-    await community_collection.update_one(
-        {"_id": ObjectId(post_id)},
-        {"$push": {"replies": reply}}
+    await add_reply(post["_id"], reply)
+    enqueue_reply(reply["_id"], content)
+    public_feed.invalidate()
+    await notify(
+        [post.get("author_id")], "reply", f"{reply['author_name']} replied to your post",
+        actor=user, ref={"post_id": post_id, "reply_id": str(reply["_id"])}
     )
 
     return {
@@ -180,45 +233,99 @@ async def reply_to_post(
         }
     }
 
+# ---------------- LIST REPLIES (lazy thread) ----------------
+@router.get("/posts/{post_id}/replies")
+async def get_replies(
+    post_id: str,
+    cursor: str = None,
+    limit: int = Query(REPLIES_PAGE_SIZE, ge=1, le=100),
+):
+    """Oldest first; pass next_cursor back as ?cursor= to keep reading"""
+    try:
+        post_oid = ObjectId(post_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid post ID")
+
+    query = {"post_id": post_oid}
+    if cursor:
+        query.update(keyset_filter("created_at", decode_cursor(cursor), "$gt"))
+
+    replies = await community_replies_collection.find(
+        query, {"post_id": 0}
+    ).sort([("created_at", 1), ("_id", 1)]).limit(limit + 1).to_list(limit + 1)
+
+    if not replies:
+        # post not migrated yet → page through its embedded replies
+        post = await community_collection.find_one({"_id": post_oid}, {"replies": 1})
+        if not post:
+            raise HTTPException(status_code=404, detail="Post not found")
+        replies = post.get("replies", [])
+        if cursor:
+            position = decode_cursor(cursor)
+            replies = [r for r in replies if (r.get("created_at"), r.get("_id")) > position]
+        replies = replies[:limit + 1]
+
+    has_more = len(replies) > limit
+    replies = replies[:limit]
+    last = replies[-1] if replies else None
+
+    return {
+        "replies": [serialize_reply(r) for r in replies],
+        "has_more": has_more,
+        "next_cursor": encode_cursor(last.get("created_at"), last["_id"]) if has_more else None,
+    }
+
 # ---------------- LIKE / UPVOTE ----------------
 @router.post("/like/{item_id}")
 async def toggle_like(item_id: str, user=Depends(get_current_user)):
-    item = await community_collection.find_one({"_id": ObjectId(item_id)})
+    try:
+        item_oid = ObjectId(item_id)
+    except Exception:
+        raise HTTPException(400, "Invalid item ID")
+
+    uid = user["_id"]
+    likes = {"$ifNull": ["$likes", []]}
+
+    # one atomic read-modify-write: add or remove the like, recount
+    item = await community_collection.find_one_and_update(
+        {"_id": item_oid},
+        [
+            {"$set": {"likes": {"$cond": [
+                {"$in": [uid, likes]},
+                {"$filter": {"input": likes, "cond": {"$ne": ["$$this", uid]}}},
+                {"$concatArrays": [likes, [uid]]},
+            ]}}},
+            {"$set": {"like_count": {"$size": "$likes"}}},
+        ],
+        projection={"likes": {"$elemMatch": {"$eq": uid}}, "like_count": 1, "author_id": 1},
+        return_document=ReturnDocument.AFTER,
+    )
     if not item:
         raise HTTPException(404, "Item not found")
 
-    if user["_id"] in item["likes"]:
-        await community_collection.update_one(
-            {"_id": ObjectId(item_id)},
-            {"$pull": {"likes": user["_id"]}}
-        )
-        return {"liked": False}
-    else:
-        await community_collection.update_one(
-            {"_id": ObjectId(item_id)},
-            {"$push": {"likes": user["_id"]}}
+    liked = bool(item.get("likes"))
+    public_feed.invalidate()
+    if liked:
+        await notify_once(
+            item.get("author_id"), "like", f"{user.get('name', 'Someone')} liked your post",
+            actor=user, ref={"post_id": item_id}
         )
-        return {"liked": True}
+
+    return {"liked": liked, "like_count": item.get("like_count", 0)}
 
 
 # ---------------- NOTIFICATIONS ----------------
 @router.get("/notifications")
-async def notifications(user=Depends(get_current_user)):
-    posts = await community_collection.find({
-        "author_id": user["_id"],
-        "type": "post"
-    }).to_list(None)
-
-    post_ids = [str(p["_id"]) for p in posts]
-
-    replies = await community_collection.find({
-        "parent_id": {"$in": post_ids}
-    }).to_list(None)
-
-    for r in replies:
-        r["_id"] = str(r["_id"])
+async def notifications(
+    limit: int = Query(20, ge=1, le=100),
+    user=Depends(get_current_user)
+):
+    """Latest community activity (replies / likes) from the user's inbox"""
+    docs = await notifications_collection.find(
+        {"user_id": str(user["_id"]), "type": {"$in": ["reply", "like"]}}
+    ).sort([("created_at", -1), ("_id", -1)]).limit(limit).to_list(limit)
 
-    return replies
+    return [serialize_notification(n) for n in docs]
 
 # ---------------- ENDPOINT ----------------
 @router.post("/ai-reply-suggestion")
@@ -242,12 +349,9 @@ Post:
     )
 
     try:
-        response = model.generate_content(prompt)
-
-        if response and getattr(response, "text", None):
-            text = response.text.strip()
-            if len(text) > 20:
-                return {"suggested_reply": text}
+        text = (await generate(prompt, route="community.reply")).strip()
+        if len(text) > 20:
+            return {"suggested_reply": text}
 
     except Exception as e:
         print("Gemini failed:", e)
@@ -1,17 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
-import google.generativeai as genai
-import os, re
+import re
 from datetime import datetime
 from database import users_collection
 from routes.user_routes import get_current_user
+from utils.llm_gateway import generate
 
 router = APIRouter(prefix="/api/future-story", tags=["Future Story"])
 
-# ---------------- Gemini Setup ----------------
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-model = genai.GenerativeModel("gemini-2.5-flash")
-
 # ---------------- Models ----------------
 
 class StoryRequest(BaseModel):
@@ -72,8 +68,7 @@ Tone:
 """
 
     try:
-        response = model.generate_content(prompt)
-        text = response.text.strip()
+        text = (await generate(prompt, route="future_story.generate")).strip()
 
         story_match = re.search(r"STORY:(.*)STEPS:", text, re.S)
         steps_match = re.search(r"STEPS:(.*)MOTIVATION:", text, re.S)
@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException
 from bson import ObjectId
+from pymongo import ReturnDocument
 from datetime import datetime
 from zoneinfo import ZoneInfo
 from typing import List
@@ -107,30 +108,33 @@ async def get_idea(idea_id: str):
 async def vote_idea(idea_id: str, user: dict = Depends(get_current_user)):
     """Toggle upvote for an idea."""
     try:
-        idea = await innovation_collection.find_one({"_id": ObjectId(idea_id)})
+        idea_oid = ObjectId(idea_id)
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid idea id")
 
+    voter = ObjectId(user["_id"])
+    voters = {"$ifNull": ["$voters", []]}
+
+    # single conditional update, so concurrent votes can't double count
+    idea = await innovation_collection.find_one_and_update(
+        {"_id": idea_oid},
+        [
+            {"$set": {"voters": {"$cond": [
+                {"$in": [voter, voters]},
+                {"$filter": {"input": voters, "cond": {"$ne": ["$$this", voter]}}},
+                {"$concatArrays": [voters, [voter]]},
+            ]}}},
+            {"$set": {"votes": {"$size": "$voters"}}},
+        ],
+        projection={"voters": {"$elemMatch": {"$eq": voter}}, "votes": 1},
+        return_document=ReturnDocument.AFTER,
+    )
+
     if not idea:
         raise HTTPException(status_code=404, detail="Idea not found")
 
-    user_id = str(user["_id"])
-    voters = [str(v) for v in idea.get("voters", [])]
-
-    if user_id in voters:
-        # Remove vote
-        await innovation_collection.update_one(
-            {"_id": ObjectId(idea_id)},
-            {"$pull": {"voters": ObjectId(user["_id"])}, "$inc": {"votes": -1}}
-        )
-        return {"message": "Vote removed"}
-    else:
-        # Add vote
-        await innovation_collection.update_one(
-            {"_id": ObjectId(idea_id)},
-            {"$push": {"voters": ObjectId(user["_id"])}, "$inc": {"votes": 1}}
-        )
-        return {"message": "Voted"}
+    voted = bool(idea.get("voters"))
+    return {"message": "Voted" if voted else "Vote removed", "voted": voted, "votes": idea.get("votes", 0)}
 
 
 @router.post("/ideas/{idea_id}/comment")
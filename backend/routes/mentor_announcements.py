@@ -5,6 +5,7 @@ from datetime import datetime, timezone
 from bson import ObjectId
 from database import announcements_collection
 from routes.user_routes import get_current_user
+from utils.notifications import notify, mentee_ids
 
 router = APIRouter(prefix="/api/mentor/announcements", tags=["Mentor Announcements"])
 
@@ -35,6 +36,12 @@ async def add_announcement(data: AnnouncementRequest, current_user=Depends(get_c
     res = await announcements_collection.insert_one(doc)
     doc["_id"] = str(res.inserted_id)
 
+    await notify(
+        await mentee_ids(str(current_user["_id"])), "announcement",
+        f"New announcement: {doc['title']}",
+        actor=current_user, ref={"announcement_id": doc["_id"]}
+    )
+
     # mark as owner for frontend
     doc["is_owner"] = True
 
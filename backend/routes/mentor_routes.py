@@ -1,8 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, Body
 from bson import ObjectId
-from pydantic import BaseModel,validator
+from pydantic import BaseModel,validator,ValidationError
 from typing import List,Optional
 from datetime import datetime
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
 import httpx
 from database import (
     teams_collection,
@@ -14,6 +16,12 @@ from database import (
     skills_collection
 )
 from routes.user_routes import get_current_user
+from utils.auth import sign_upload_url
+from utils.team_summary import team_summaries, team_summaries_many, record_grade
+from routes.team_routes.rubric import RubricRequest
+from utils.grade_analytics import cohort_analytics, invalidate_cohort_analytics
+from utils.loaders import UserLoader, user_loader
+from utils.notifications import notify
 import urllib.parse
 router = APIRouter(prefix="/mentor", tags=["Mentor"])
 
@@ -40,22 +48,13 @@ async def mentor_dashboard_stats(user=Depends(get_current_user)):
         "team_id": {"$in": team_ids}
     })
 
-    # ✅ Only consider plagiarism linked to actual submissions for this mentor
-    plagiarism_alerts = 0
-    if team_ids:
-        for team_id in team_ids:
-            # Get the latest submission for the team
-            submission = await submissions_collection.find_one(
-                {"team_id": team_id},
-                sort=[("created_at", -1)]
-            )
-            if submission:
-                # Check plagiarism linked to that submission
-                plagiarism = await plagiarism_collection.find_one(
-                    {"submission_id": submission["_id"], "score": {"$gte": 70}}
-                )
-                if plagiarism:
-                    plagiarism_alerts += 1
+    # ✅ Latest plagiarism result is summarised on each team document
+    # (teams from before the summaries are filled in here, in one batch)
+    summaries = await team_summaries_many(teams)
+    plagiarism_alerts = sum(
+        1 for _, plagiarism in summaries.values()
+        if ((plagiarism or {}).get("score") or 0) >= 70
+    )
 
     return {
         "totalTeams": len(teams),
@@ -65,7 +64,8 @@ async def mentor_dashboard_stats(user=Depends(get_current_user)):
     }
 # ---------------- Get all mentees ----------------
 @router.get("/my-mentees")
-async def get_my_mentees(current_user=Depends(get_current_user)):
+async def get_my_mentees(current_user=Depends(get_current_user),
+                         loader: UserLoader = Depends(user_loader)):
     if current_user.get("role") != "mentor":
         raise HTTPException(status_code=403, detail="Access denied")
 
@@ -75,13 +75,16 @@ async def get_my_mentees(current_user=Depends(get_current_user)):
     teams = await teams_collection.find({"mentor_id": mentor_id}).to_list(None)
     mentees = []
 
-    # 2️⃣ Extract individual members
+    # 2️⃣ Resolve every member in one batched lookup
+    await loader.load_many(m["id"] for team in teams for m in team.get("members", []))
+
+    # 3️⃣ Extract individual members
     for team in teams:
         for m in team.get("members", []):
             # Only include unique mentees
             if not any(existing["id"] == m["id"] for existing in mentees):
-                # Fetch user details
-                user = await users_collection.find_one({"_id": ObjectId(m["id"])})
+                # Fetch user details (cached by the loader)
+                user = await loader.load(m["id"])
                 submissions_count = await submissions_collection.count_documents({"team_id": str(team["_id"])})
                 mentees.append({
                     "id": m["id"],
@@ -285,33 +288,21 @@ async def mentor_team_view(team_id: str, user=Depends(get_current_user)):
     if mentor_id not in [team.get("mentor_id"), team.get("requested_mentor_id")]:
         raise HTTPException(403, "You are not assigned to this team")
 
-    # Get latest submission
-    submission_list = await submissions_collection.find(
-        {"team_id": team_id}
-    ).sort("submitted_at", -1).limit(1).to_list(1)
-
-    submission = submission_list[0] if submission_list else {}
+    # Latest submission / plagiarism from the team's summaries
+    latest, plagiarism = await team_summaries(team)
+    submission = dict(latest or {})
 
     # Attach uploaded files from team_files_collection
     files = []
-    async for f in team_files_collection.find({"team_id": team_id}):
+    async for f in team_files_collection.find(
+        {"team_id": team_id}, {"filename": 1, "url": 1}
+    ):
         files.append({
             "filename": f["filename"],
-            "url": f["url"]
+            "url": sign_upload_url(f["url"])
         })
     submission["files"] = files
-    submission["_id"] = str(submission.get("_id", ""))
-
-    # Attach plagiarism info if exists
-    plagiarism = None
-    submission_id = submission.get("_id")
-    if submission_id:
-        plagiarism_list = await plagiarism_collection.find(
-            {"submission_id": submission_id}  # <-- string
-        ).sort("checked_at", -1).limit(1).to_list(1)
-        plagiarism = plagiarism_list[0] if plagiarism_list else None
-        if plagiarism:
-            plagiarism["_id"] = str(plagiarism["_id"])
+    submission["_id"] = submission.get("id", "")
 
     # Prepare response
     return {
@@ -334,27 +325,172 @@ async def save_rubric(team_id: str, rubric: dict = Body(...), user=Depends(get_c
     if user["role"] != "mentor":
         raise HTTPException(403)
 
-    submission_list = await submissions_collection.find(
-        {"team_id": team_id}
-    ).sort("created_at", -1).limit(1).to_list(1)
+    try:
+        tid = ObjectId(team_id)
+    except:
+        raise HTTPException(400, "Invalid team ID")
 
-    if not submission_list:
+    team = await teams_collection.find_one({"_id": tid})
+    if not team:
+        raise HTTPException(404, "Team not found")
+
+    latest, _ = await team_summaries(team)
+    if not latest:
         raise HTTPException(400, "No submission")
 
-    submission = submission_list[0]
     final_score = sum(int(v) for v in rubric.values())
+    graded_at = datetime.utcnow()
 
     await submissions_collection.update_one(
-        {"_id": submission["_id"]},
+        {"team_id": team_id, "version": latest["version"]},
         {"$set": {
             "rubric": rubric,
             "final_score": final_score,
-            "graded_at": datetime.utcnow()
+            "graded_at": graded_at
         }}
     )
+    await record_grade(team_id, latest["version"], rubric, final_score, graded_at)
+    invalidate_cohort_analytics(team.get("mentor_id"))
 
     return {"final_score": final_score}
 
+# ======================================================
+# BULK RUBRIC GRADING
+# ======================================================
+class BulkGradeRequest(BaseModel):
+    grades: List[dict]  # [{"team_id": ..., "rubric": {...}}], validated per item
+
+async def _bulk_write_errors(collection, ops):
+    """Run an unordered bulk_write, returning {op index: error message}"""
+    if not ops:
+        return {}
+    try:
+        await collection.bulk_write(ops, ordered=False)
+    except BulkWriteError as e:
+        return {err["index"]: err.get("errmsg", "Write failed") for err in e.details.get("writeErrors", [])}
+    return {}
+
+@router.post("/rubrics/bulk")
+async def bulk_save_rubrics(payload: BulkGradeRequest, user=Depends(get_current_user)):
+    if user["role"] != "mentor":
+        raise HTTPException(403)
+
+    mentor_id = str(user["_id"])
+    results = {}
+    grades = {}
+    seen = set()
+
+    # 1️⃣ Validate every entry against the rubric schema
+    for item in payload.grades:
+        team_id = str(item.get("team_id", ""))
+        if team_id in seen:
+            grades.pop(team_id, None)
+            results[team_id] = {"team_id": team_id, "ok": False, "error": "Duplicate team in request"}
+            continue
+        seen.add(team_id)
+        if not ObjectId.is_valid(team_id):
+            results[team_id] = {"team_id": team_id, "ok": False, "error": "Invalid team ID"}
+            continue
+        try:
+            rubric = RubricRequest(**(item.get("rubric") or {})).model_dump()
+        except (ValidationError, TypeError) as e:
+            results[team_id] = {"team_id": team_id, "ok": False, "error": f"Invalid rubric: {e}"}
+            continue
+        grades[team_id] = rubric
+
+    # 2️⃣ One query for all teams this mentor may grade
+    teams = {}
+    if grades:
+        async for t in teams_collection.find(
+            {
+                "_id": {"$in": [ObjectId(tid) for tid in grades]},
+                "$or": [{"mentor_id": mentor_id}, {"requested_mentor_id": mentor_id}]
+            },
+            {"latest_submission": 1, "latest_plagiarism": 1, "mentor_id": 1}
+        ):
+            teams[str(t["_id"])] = t
+    summaries = await team_summaries_many(list(teams.values()))
+
+    # 3️⃣ Only grade submissions that still exist (one query for all)
+    wanted = [
+        {"team_id": tid, "version": summaries[tid][0]["version"]}
+        for tid in teams if summaries[tid][0]
+    ]
+    existing = set()
+    if wanted:
+        async for sub in submissions_collection.find({"$or": wanted}, {"team_id": 1, "version": 1}):
+            existing.add((sub["team_id"], sub["version"]))
+
+    # 4️⃣ Build one unordered bulk write per collection
+    graded_at = datetime.utcnow()
+    submission_ops, team_ops, op_teams = [], [], []
+    for team_id, rubric in grades.items():
+        team = teams.get(team_id)
+        if not team:
+            results[team_id] = {"team_id": team_id, "ok": False, "error": "Team not found or not assigned"}
+            continue
+
+        latest, _ = summaries[team_id]
+        if not latest:
+            results[team_id] = {"team_id": team_id, "ok": False, "error": "No submission"}
+            continue
+        if (team_id, latest["version"]) not in existing:
+            results[team_id] = {"team_id": team_id, "ok": False, "error": "Submission not found"}
+            continue
+
+        final_score = sum(rubric.values())
+        grade = {"rubric": rubric, "final_score": final_score, "graded_at": graded_at}
+        submission_ops.append(UpdateOne(
+            {"team_id": team_id, "version": latest["version"]},
+            {"$set": grade}
+        ))
+        team_ops.append(UpdateOne(
+            {"_id": team["_id"], "latest_submission.version": latest["version"]},
+            {"$set": {f"latest_submission.{k}": v for k, v in grade.items()}}
+        ))
+        op_teams.append(team_id)
+        results[team_id] = {
+            "team_id": team_id,
+            "ok": True,
+            "version": latest["version"],
+            "final_score": final_score
+        }
+
+    failed = await _bulk_write_errors(submissions_collection, submission_ops)
+    await _bulk_write_errors(teams_collection, [
+        op for i, op in enumerate(team_ops) if i not in failed
+    ])
+    for index, message in failed.items():
+        team_id = op_teams[index]
+        results[team_id] = {"team_id": team_id, "ok": False, "error": message}
+
+    # analytics are cached per assigned mentor, not per grader
+    for mentor in {teams[tid].get("mentor_id") for tid in op_teams}:
+        if mentor:
+            invalidate_cohort_analytics(mentor)
+
+    return {
+        "graded": sum(1 for r in results.values() if r["ok"]),
+        "failed": sum(1 for r in results.values() if not r["ok"]),
+        "results": list(results.values())
+    }
+
+# ======================================================
+# COHORT ANALYTICS
+# ======================================================
+@router.get("/analytics/cohort")
+async def mentor_cohort_analytics(user=Depends(get_current_user)):
+    if user["role"] != "mentor":
+        raise HTTPException(403)
+
+    mentor_id = str(user["_id"])
+    team_ids = [
+        str(t["_id"])
+        async for t in teams_collection.find({"mentor_id": mentor_id}, {"_id": 1})
+    ]
+
+    return await cohort_analytics(mentor_id, team_ids, list(RubricRequest.model_fields))
+
 # ======================================================
 # APPROVE / REJECT SUBMISSION
 # ======================================================
@@ -400,6 +536,13 @@ async def mentor_decision(team_id: str, body: dict, user=Depends(get_current_use
         {"$set": update}
     )
 
+    # 🔔 let the whole team know
+    await notify(
+        [m.get("id") for m in team.get("members", [])] + [team.get("creator_id")],
+        "review", f"Your submission for {team.get('team_name', 'your team')} was {decision}",
+        actor=user, ref={"team_id": team_id, "status": decision}
+    )
+
     return {"success": True}
 
 
@@ -0,0 +1,63 @@
+from fastapi import APIRouter, Depends, Query
+from bson import ObjectId
+from database import notifications_collection
+from routes.user_routes import get_current_user
+from utils.cursors import encode_cursor, decode_cursor, keyset_filter
+from utils.notifications import serialize_notification
+
+router = APIRouter(prefix="/api/notifications", tags=["Notifications"])
+
+PAGE_SIZE = 20
+
+
+# ---------------- GET: Inbox ----------------
+@router.get("")
+async def get_notifications(
+    cursor: str = None,
+    limit: int = Query(PAGE_SIZE, ge=1, le=100),
+    unread_only: bool = False,
+    current_user=Depends(get_current_user),
+):
+    uid = str(current_user["_id"])
+    query = {"user_id": uid}
+    if unread_only:
+        query["read"] = False
+    if cursor:
+        query.update(keyset_filter("created_at", decode_cursor(cursor), "$lt"))
+
+    docs = await notifications_collection.find(query).sort(
+        [("created_at", -1), ("_id", -1)]
+    ).limit(limit + 1).to_list(limit + 1)
+
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+
+    return {
+        "notifications": [serialize_notification(n) for n in docs],
+        "unread_count": await notifications_collection.count_documents({"user_id": uid, "read": False}),
+        "has_more": has_more,
+        "next_cursor": encode_cursor(docs[-1]["created_at"], docs[-1]["_id"]) if has_more else None,
+    }
+
+
+# ---------------- GET: Unread count ----------------
+@router.get("/unread-count")
+async def get_unread_count(current_user=Depends(get_current_user)):
+    count = await notifications_collection.count_documents(
+        {"user_id": str(current_user["_id"]), "read": False}
+    )
+    return {"unread_count": count}
+
+
+# ---------------- POST: Mark read ----------------
+@router.post("/read")
+async def mark_notifications_read(data: dict = None, current_user=Depends(get_current_user)):
+    """Body {"ids": [...]} marks those; no ids = mark everything read"""
+    query = {"user_id": str(current_user["_id"]), "read": False}
+
+    ids = (data or {}).get("ids")
+    if ids:
+        query["_id"] = {"$in": [ObjectId(i) for i in ids if ObjectId.is_valid(i)]}
+
+    result = await notifications_collection.update_many(query, {"$set": {"read": True}})
+    return {"marked_read": result.modified_count}
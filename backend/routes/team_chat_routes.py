@@ -1,14 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect
 from bson import ObjectId
 from datetime import datetime, timedelta, timezone
-from database import teams_collection, chat_messages_collection, users_collection
+from database import teams_collection, users_collection
 from routes.user_routes import get_current_user
+from utils.auth import decode_access_token
+from utils.chat_hub import hub
+from utils.cursors import encode_cursor, decode_cursor
+from utils.chat_store import chat_store
+from utils.chat_read_state import team_participants, record_message, mark_read, unread_counts
+from utils.loaders import UserLoader, user_loader
 
 router = APIRouter(prefix="/api/team", tags=["Team Chat"])
+ws_router = APIRouter(prefix="/api/chat", tags=["Team Chat"])
 
 # ---------------- Timezone (IST) ----------------
 IST = timezone(timedelta(hours=5, minutes=30))
 
+# ---------------- History paging ----------------
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+MAX_SEARCH_RESULTS = 50
+
 # ---------------- Helper: safely convert to ObjectId ----------------
 def to_objectid(id_str: str):
     try:
@@ -17,28 +30,106 @@ def to_objectid(id_str: str):
         raise HTTPException(status_code=400, detail="Invalid ID format")
 
 
+# ---------------- Helpers: cursors ----------------
+def parse_since(since: str) -> datetime:
+    try:
+        ts = datetime.fromisoformat(since.replace("Z", "+00:00"))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid 'since' timestamp")
+    # naive values are taken as IST, the zone the API hands timestamps out in
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=IST)
+    return ts.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+# ---------------- Helpers: messages ----------------
+def serialize_message(msg: dict) -> dict:
+    ts = msg.get("timestamp")
+    cursor = encode_cursor(ts, msg["_id"])
+
+    # convert UTC → IST and format 24-hour
+    if isinstance(ts, datetime):
+        ts = ts.replace(tzinfo=timezone.utc).astimezone(IST).strftime("%Y-%m-%d %H:%M:%S")
+
+    return {
+        "id": str(msg["_id"]),
+        "sender_id": msg.get("sender_id"),
+        "sender_name": msg.get("sender_name", "Unknown"),
+        "text": msg.get("text", ""),
+        "timestamp": ts,
+        "cursor": cursor,
+    }
+
+
+def can_access_team(team: dict, user_id: str) -> bool:
+    return user_id in team_participants(team)
+
+
+async def save_message(team: dict, user: dict, text: str) -> dict:
+    """Persist a chat message once, bump unread counters, fan out to sockets"""
+    team_id = str(team["_id"])
+    message_doc = {
+        "sender_id": str(user["_id"]),
+        "sender_name": user.get("full_name", user.get("name", "User")),
+        "text": text,
+        # store in UTC (best practice)
+        "timestamp": datetime.utcnow(),
+    }
+
+    await chat_store.append(team_id, message_doc)
+    await record_message(team, message_doc["sender_id"])
+
+    payload = serialize_message(message_doc)
+    await hub.publish(team_id, payload)
+    return payload
+
+
+# ---------------- GET: Unread counts (all my teams) ----------------
+# declared before /{team_id} so "chat" is never taken for a team id
+@router.get("/chat/unread")
+async def get_unread_counts(current_user=Depends(get_current_user)):
+    uid = str(current_user["_id"])
+    teams = await teams_collection.find(
+        {"$or": [{"creator_id": uid}, {"members.id": uid}, {"mentor_id": uid}]},
+        {"team_name": 1, "name": 1}
+    ).to_list(None)
+
+    counts = await unread_counts(uid, [str(t["_id"]) for t in teams])
+
+    return {
+        "total_unread": sum(counts.values()),
+        "teams": [
+            {
+                "team_id": str(t["_id"]),
+                "team_name": t.get("team_name") or t.get("name", "Unnamed Team"),
+                "unread": counts.get(str(t["_id"]), 0),
+            }
+            for t in teams
+        ],
+    }
+
+
 # ---------------- GET: Team info ----------------
 @router.get("/{team_id}")
-async def get_team_info(team_id: str, current_user=Depends(get_current_user)):
+async def get_team_info(team_id: str, current_user=Depends(get_current_user),
+                        loader: UserLoader = Depends(user_loader)):
     team = await teams_collection.find_one({"_id": to_objectid(team_id)})
     if not team:
         raise HTTPException(status_code=404, detail="Team not found")
 
-    member_details = []
+    member_ids = []
     for member in team.get("members", []):
         if isinstance(member, dict):
             member_id = member.get("_id") or member.get("id")
         else:
             member_id = member
 
-        if not member_id:
-            continue
-
-        try:
-            user = await users_collection.find_one({"_id": ObjectId(member_id)})
-        except Exception:
-            continue
+        if member_id:
+            member_ids.append(member_id)
 
+    # one $in query for the whole roster, in roster order
+    member_details = []
+    for user in await loader.load_many(member_ids):
         if user:
             member_details.append({
                 "id": str(user["_id"]),
@@ -59,34 +150,94 @@ async def get_team_info(team_id: str, current_user=Depends(get_current_user)):
 
 # ---------------- GET: Team chat ----------------
 @router.get("/{team_id}/chat")
-async def get_team_chat(team_id: str, current_user=Depends(get_current_user)):
+async def get_team_chat(
+    team_id: str,
+    before: str = None,
+    after: str = None,
+    since: str = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user=Depends(get_current_user),
+):
+    """Page through a team's chat, oldest → newest within each page.
+
+    - no cursor: the latest `limit` messages
+    - before=<cursor>: older messages (scrolling back)
+    - after=<cursor> / since=<ISO time>: only what arrived after the last
+      message the client has seen
+    """
+    if sum(x is not None for x in (before, after, since)) > 1:
+        raise HTTPException(status_code=400, detail="Use only one of before, after or since")
+
     team_obj_id = to_objectid(team_id)
 
-    team = await teams_collection.find_one({"_id": team_obj_id})
+    team = await teams_collection.find_one(
+        {"_id": team_obj_id}, {"members": 1, "creator_id": 1, "mentor_id": 1}
+    )
     if not team:
         raise HTTPException(status_code=404, detail="Team not found")
+    if not can_access_team(team, str(current_user["_id"])):
+        raise HTTPException(status_code=403, detail="Not a member of this team")
 
-    cursor = chat_messages_collection.find(
-        {"team_id": str(team_obj_id)}
-    ).sort("timestamp", 1)
+    position = {}
+    if before is not None:
+        position["before"] = decode_cursor(before)
+    elif after is not None:
+        position["after"] = decode_cursor(after)
+    elif since is not None:
+        # after the largest possible id at that instant == strictly after it
+        position["after"] = (parse_since(since), ObjectId("f" * 24))
 
-    messages = []
-    async for msg in cursor:
-        ts = msg.get("timestamp")
+    docs, has_more = await chat_store.page(str(team_obj_id), limit=limit, **position)
 
-        # convert UTC → IST and format 24-hour
-        if isinstance(ts, datetime):
-            ts = ts.replace(tzinfo=timezone.utc).astimezone(IST).strftime("%Y-%m-%d %H:%M:%S")
+    messages = [serialize_message(msg) for msg in docs]
+
+    return {
+        "messages": messages,
+        "has_more": has_more,
+        # older page: pass as ?before=, newer messages: pass as ?after=
+        "before_cursor": messages[0]["cursor"] if messages else before,
+        "after_cursor": messages[-1]["cursor"] if messages else after,
+    }
 
-        messages.append({
-            "id": str(msg["_id"]),
-            "sender_id": msg.get("sender_id"),
-            "sender_name": msg.get("sender_name", "Unknown"),
-            "text": msg.get("text", ""),
-            "timestamp": ts,
-        })
 
-    return {"messages": messages}
+# ---------------- GET: Search team chat ----------------
+@router.get("/{team_id}/chat/search")
+async def search_team_chat(
+    team_id: str,
+    q: str = Query(..., min_length=1, max_length=200),
+    page: int = Query(1, ge=1),
+    limit: int = Query(20, ge=1, le=MAX_SEARCH_RESULTS),
+    context: int = Query(2, ge=0, le=10),
+    current_user=Depends(get_current_user),
+):
+    """Ranked hits for `q`, each with `context` messages either side"""
+    team_obj_id = to_objectid(team_id)
+    team = await teams_collection.find_one({"_id": team_obj_id})
+    if not team:
+        raise HTTPException(status_code=404, detail="Team not found")
+    if not can_access_team(team, str(current_user["_id"])):
+        raise HTTPException(status_code=403, detail="Not a member of this team")
+
+    team_key = str(team_obj_id)
+    hits, has_more = await chat_store.search(team_key, q, skip=(page - 1) * limit, limit=limit)
+
+    async def with_context(msg, score):
+        before, after = [], []
+        if context:
+            (before, _), (after, _) = await asyncio.gather(
+                chat_store.page(team_key, before=(msg["timestamp"], msg["_id"]), limit=context),
+                chat_store.page(team_key, after=(msg["timestamp"], msg["_id"]), limit=context),
+            )
+        return {
+            "message": serialize_message(msg),
+            "score": score,
+            "context_before": [serialize_message(m) for m in before],
+            "context_after": [serialize_message(m) for m in after],
+        }
+
+    results = await asyncio.gather(*(with_context(msg, score) for msg, score in hits))
+
+    return {"query": q, "page": page, "has_more": has_more, "results": results}
 
 
 # ---------------- POST: Send message ----------------
@@ -100,16 +251,76 @@ async def send_team_message(team_id: str, data: dict, current_user=Depends(get_c
     team = await teams_collection.find_one({"_id": team_obj_id})
     if not team:
         raise HTTPException(status_code=404, detail="Team not found")
+    if not can_access_team(team, str(current_user["_id"])):
+        raise HTTPException(status_code=403, detail="Not a member of this team")
 
-    message_doc = {
-        "team_id": str(team_obj_id),
-        "sender_id": str(current_user["_id"]),
-        "sender_name": current_user.get("full_name", current_user.get("name", "User")),
-        "text": text,
-        # store in UTC (best practice)
-        "timestamp": datetime.utcnow(),
-    }
-
-    await chat_messages_collection.insert_one(message_doc)
+    await save_message(team, current_user, text)
 
     return {"message": "Message sent successfully"}
+
+
+# ---------------- POST: Mark chat read ----------------
+@router.post("/{team_id}/chat/read")
+async def mark_team_chat_read(team_id: str, data: dict = None, current_user=Depends(get_current_user)):
+    """Body {"cursor": "..."} marks up to that message; no cursor = everything"""
+    team_obj_id = to_objectid(team_id)
+    team = await teams_collection.find_one({"_id": team_obj_id})
+    if not team:
+        raise HTTPException(status_code=404, detail="Team not found")
+    if not can_access_team(team, str(current_user["_id"])):
+        raise HTTPException(status_code=403, detail="Not a member of this team")
+
+    cursor = (data or {}).get("cursor")
+    position = decode_cursor(cursor) if cursor else None
+    unread = await mark_read(str(team_obj_id), str(current_user["_id"]), position, cursor)
+
+    return {"message": "Chat marked as read", "unread": unread}
+
+
+# ---------------- WS: Live team chat ----------------
+@ws_router.websocket("/ws/{team_id}")
+async def team_chat_socket(websocket: WebSocket, team_id: str, token: str = Query(None)):
+    payload = decode_access_token(token) if token else None
+    if not payload or "user_id" not in payload or not ObjectId.is_valid(team_id):
+        await websocket.close(code=1008)
+        return
+
+    user = await users_collection.find_one({"_id": ObjectId(payload["user_id"])})
+    team = await teams_collection.find_one({"_id": ObjectId(team_id)})
+    if not user or not team or not can_access_team(team, str(user["_id"])):
+        await websocket.close(code=1008)
+        return
+
+    await websocket.accept()
+    sub = hub.subscribe(team_id)
+
+    async def pump_out():
+        while True:
+            message = await sub.queue.get()
+            await websocket.send_json(message)
+
+    async def pump_in():
+        while True:
+            data = await websocket.receive_json()
+            text = str(data.get("text", "")).strip() if isinstance(data, dict) else ""
+            if text:
+                await save_message(team, user, text)
+
+    tasks = [
+        asyncio.create_task(pump_out()),
+        asyncio.create_task(pump_in()),
+        asyncio.create_task(sub.overflowed.wait()),
+    ]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        if tasks[2] in done:
+            # slow consumer: drop it, the client reloads history on reconnect
+            await websocket.close(code=1013, reason="Too far behind, reconnect")
+        for task in done:
+            if not task.cancelled() and task.exception() and \
+                    not isinstance(task.exception(), WebSocketDisconnect):
+                print("Team chat socket error:", task.exception())
+    finally:
+        hub.unsubscribe(team_id, sub)
+        for task in tasks:
+            task.cancel()
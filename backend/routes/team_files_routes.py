@@ -1,16 +1,19 @@
 from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
 from datetime import datetime
 from bson import ObjectId
-import os, uuid
+from fastapi.concurrency import run_in_threadpool
 from database import teams_collection, team_files_collection, plagiarism_collection
 from routes.user_routes import get_current_user
+from utils.auth import sign_upload_url
+from utils.team_summary import record_plagiarism
+from utils.blob_store import (
+    store_upload, has_blob_text, set_blob_text, release_blob, path_to_url,
+    url_to_path, write_compressed_variants, schedule_removal
+)
 from PyPDF2 import PdfReader
 
 router = APIRouter(prefix="/team-files", tags=["Team Files"])
 
-UPLOAD_DIR = "uploads"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-
 # ------------------ Helpers ------------------
 def extract_text(file_path: str) -> str:
     if not file_path.lower().endswith(".pdf"):
@@ -56,27 +59,29 @@ async def upload_team_file(
     if not is_authorized(team, user_id):
         raise HTTPException(403, "Not authorized")
 
-    # Save file
-    unique_name = f"{uuid.uuid4()}_{file.filename}"
-    file_path = os.path.join(UPLOAD_DIR, unique_name)
-    with open(file_path, "wb") as f:
-        f.write(await file.read())
+    # Save file (deduplicated by content hash)
+    blob = await store_upload(file)
+
+    await run_in_threadpool(write_compressed_variants, blob["path"])
 
-    # Extract text for plagiarism
-    extracted_text = extract_text(file_path)
+    # Extract text for plagiarism (once per blob, stored outside team_files)
+    if not await has_blob_text(blob["_id"]):
+        extracted_text = await run_in_threadpool(extract_text, blob["path"])
+        await set_blob_text(blob["_id"], extracted_text)
 
     # Insert into DB
     result = await team_files_collection.insert_one({
         "team_id": team_id,
         "filename": file.filename,
         "file_type": file.content_type,
-        "url": f"/uploads/{unique_name}",
+        "url": path_to_url(blob["path"]),
+        "blob_id": blob["_id"],
         "uploaded_by": user_id,
-        "uploaded_at": datetime.utcnow(),
-        "text": extracted_text
+        "uploaded_at": datetime.utcnow()
     })
 
     if not result.inserted_id:
+        await release_blob(blob["_id"])
         raise HTTPException(500, "Failed to store file info in DB")
 
     return {"message": "File uploaded successfully", "id": str(result.inserted_id)}
@@ -98,11 +103,14 @@ async def get_team_files(team_id: str, current_user: dict = Depends(get_current_
         raise HTTPException(403, "Not authorized")
 
     files = []
-    async for f in team_files_collection.find({"team_id": team_id}):
+    async for f in team_files_collection.find(
+        {"team_id": team_id},
+        {"filename": 1, "url": 1, "uploaded_by": 1, "uploaded_at": 1}
+    ):
         files.append({
             "id": str(f["_id"]),          # ⚡ must be "id" for frontend
             "filename": f["filename"],
-            "url": f["url"],
+            "url": sign_upload_url(f["url"]),
             "uploaded_by": f["uploaded_by"],
             "uploaded_at": f["uploaded_at"]
         })
@@ -118,7 +126,10 @@ async def delete_team_file(
 ):
     try:
         team = await teams_collection.find_one({"_id": ObjectId(team_id)})
-        file_doc = await team_files_collection.find_one({"_id": ObjectId(file_id)})
+        file_doc = await team_files_collection.find_one(
+            {"_id": ObjectId(file_id)},
+            {"url": 1, "blob_id": 1, "uploaded_by": 1}
+        )
     except:
         raise HTTPException(status_code=400, detail="Invalid ID")
 
@@ -137,17 +148,19 @@ async def delete_team_file(
     if user_id != str(team["creator_id"]) and user_id != file_doc["uploaded_by"]:
         raise HTTPException(status_code=403, detail="Not allowed")
 
-    # Delete physical file
-    file_path = file_doc["url"].lstrip("/")
-    if os.path.exists(file_path):
-        os.remove(file_path)
-
     # Delete DB record
     await team_files_collection.delete_one({"_id": ObjectId(file_id)})
 
+    # Drop the blob reference (legacy records own their file outright)
+    if file_doc.get("blob_id"):
+        await release_blob(file_doc["blob_id"])
+    else:
+        schedule_removal(url_to_path(file_doc["url"]))
+
     # Cleanup plagiarism if no files left
     remaining = await team_files_collection.count_documents({"team_id": team_id})
     if remaining == 0:
         await plagiarism_collection.delete_many({"team_id": team_id})
+        await record_plagiarism(team_id, None)
 
     return {"message": "File deleted successfully"}
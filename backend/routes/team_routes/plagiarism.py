@@ -5,6 +5,8 @@ from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 from routes.user_routes import get_current_user
 from database import plagiarism_collection, team_files_collection
+from utils.blob_store import iter_blob_texts
+from utils.team_summary import record_plagiarism
 
 router = APIRouter()
 
@@ -14,22 +16,41 @@ def clean_text(text: str) -> str:
     text = re.sub(r'[^a-z0-9 ]', '', text)
     return text
 
+async def collect_texts(query: dict) -> list:
+    """Texts of the matching team files, streamed from file_texts.
+
+    Records that predate the blob store may still carry inline "text".
+    """
+    blob_ids, texts = set(), []
+    async for f in team_files_collection.find(query, {"blob_id": 1, "text": 1}):
+        if f.get("blob_id"):
+            blob_ids.add(f["blob_id"])
+        elif isinstance(f.get("text"), str) and f["text"].strip():
+            texts.append(f["text"])
+
+    async for _, text in iter_blob_texts(blob_ids):
+        if text.strip():
+            texts.append(text)
+    return texts
+
 @router.get("/plagiarism/{team_id}")
 async def plagiarism(team_id: str, user=Depends(get_current_user)):
-    files = await team_files_collection.find({"team_id": team_id}).to_list(None)
+    files = await team_files_collection.find({"team_id": team_id}, {"_id": 1}).to_list(None)
 
     if not files:
         await plagiarism_collection.delete_many({"team_id": team_id})
+        await record_plagiarism(team_id, None)
         return {
             "score": 0,
             "status": "No files uploaded",
             "checked_at": None
         }
 
-    texts = [f["text"] for f in files if isinstance(f.get("text"), str) and f["text"].strip()]
+    texts = await collect_texts({"team_id": team_id})
 
     if not texts:
         await plagiarism_collection.delete_many({"team_id": team_id})
+        await record_plagiarism(team_id, None)
         return {
             "score": 0,
             "status": "No text content",
@@ -38,11 +59,9 @@ async def plagiarism(team_id: str, user=Depends(get_current_user)):
 
     combined_text = " ".join(texts)
 
-    others = await team_files_collection.find(
-        {"team_id": {"$ne": team_id}, "text": {"$exists": True, "$ne": ""}}
-    ).to_list(None)
+    others = await collect_texts({"team_id": {"$ne": team_id}})
 
-    corpus = [combined_text] + [o["text"] for o in others if o.get("text")]
+    corpus = [combined_text] + others
 
     # 🔒 CRITICAL GUARD
     if len(corpus) < 2:
@@ -57,6 +76,7 @@ async def plagiarism(team_id: str, user=Depends(get_current_user)):
             {"$set": report},
             upsert=True
         )
+        await record_plagiarism(team_id, report)
         return report
 
     try:
@@ -87,5 +107,6 @@ async def plagiarism(team_id: str, user=Depends(get_current_user)):
         {"$set": report},
         upsert=True
     )
+    await record_plagiarism(team_id, report)
 
     return report
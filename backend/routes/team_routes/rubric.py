@@ -4,6 +4,8 @@ from datetime import datetime
 from bson import ObjectId
 from database import submissions_collection, teams_collection
 from routes.user_routes import get_current_user
+from utils.team_summary import team_summaries, record_grade
+from utils.grade_analytics import invalidate_cohort_analytics
 
 router = APIRouter()
 
@@ -29,20 +31,27 @@ async def save_rubric(
     if team.get("mentor_id") != str(user["_id"]):
         raise HTTPException(403, "Only mentor can grade")
 
+    latest, _ = await team_summaries(team)
+    if not latest:
+        raise HTTPException(400, "No submission")
+
     # 🔢 Calculate final score
     final_score = sum(rubric.values())
+    graded_at = datetime.utcnow()
 
-    # 🔄 Update latest submission
+    # 🔄 Update latest submission (and the team's summary of it)
     await submissions_collection.update_one(
-        {"team_id": team_id},
+        {"team_id": team_id, "version": latest["version"]},
         {
             "$set": {
                 "rubric": rubric,
                 "final_score": final_score,
-                "graded_at": datetime.utcnow(),
+                "graded_at": graded_at,
             }
         }
     )
+    await record_grade(team_id, latest["version"], rubric, final_score, graded_at)
+    invalidate_cohort_analytics(team.get("mentor_id"))
 
     return {
         "final_score": final_score
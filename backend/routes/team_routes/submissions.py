@@ -1,16 +1,227 @@
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException
+import hashlib
+import os
+import zipfile
+from collections import OrderedDict
+from typing import Optional
+from urllib.parse import quote
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
 from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 from routes.user_routes import get_current_user
+from routes.uploads_routes import parse_range
+from utils.auth import sign_upload_url
+from utils.blob_store import url_to_path
+from utils.team_summary import submission_summary
 from database import submissions_collection, teams_collection, team_files_collection
 
 router = APIRouter()
 
+ZIP_CHUNK_SIZE = 256 * 1024
+ZIP_LAYOUT_CACHE_SIZE = 128
+
+# ===================== ZIP STREAMING =====================
+class _ZipSink:
+    """Unseekable write target; zipfile then emits data descriptors and
+    never needs to go back, so bytes can be handed out as they are written."""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.offset = 0
+
+    def write(self, data):
+        self.buffer += data
+        self.offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.offset
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
+
+def zip_layout(entries):
+    """Stored (uncompressed) ZIP of entries as a list of segments.
+
+    entries: list of (arcname, path, size, date_time). A segment is either
+    bytes (local header, data descriptor, central directory) or a
+    (path, size) pair whose bytes are the file itself, since stored data is
+    copied verbatim. Building it reads every file once for the CRCs; after
+    that the archive can be served or resumed at any offset from disk.
+    """
+    sink = _ZipSink()
+    segments = []
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as zf:
+        for arcname, path, size, date_time in entries:
+            info = zipfile.ZipInfo(arcname, date_time=date_time)
+            with zf.open(info, "w", force_zip64=True) as dst:
+                segments.append(sink.drain())
+                written = 0
+                with open(path, "rb") as src:
+                    for chunk in iter(lambda: src.read(ZIP_CHUNK_SIZE), b""):
+                        dst.write(chunk)
+                        sink.buffer.clear()  # served straight from the file
+                        written += len(chunk)
+                segments.append((path, written))
+            segments.append(sink.drain())
+    segments.append(sink.drain())
+    return [seg for seg in segments if seg != b""]
+
+def layout_length(layout) -> int:
+    return sum(len(seg) if isinstance(seg, bytes) else seg[1] for seg in layout)
+
+def layout_chunks(layout, start: int = 0, end: int = None):
+    """Yield bytes start..end (inclusive) of the archive, skipping whole
+    segments before `start` and seeking inside the file that holds it"""
+    offset = 0
+    for seg in layout:
+        length = len(seg) if isinstance(seg, bytes) else seg[1]
+        seg_start, offset = offset, offset + length
+        if offset <= start:
+            continue
+        if end is not None and seg_start > end:
+            return
+
+        lo = max(start - seg_start, 0)
+        hi = length if end is None else min(end - seg_start + 1, length)
+        if isinstance(seg, bytes):
+            yield seg[lo:hi]
+            continue
+
+        with open(seg[0], "rb") as src:
+            src.seek(lo)
+            remaining = hi - lo
+            while remaining > 0:
+                chunk = src.read(min(ZIP_CHUNK_SIZE, remaining))
+                if not chunk:
+                    # abort the response rather than end short of Content-Length
+                    raise OSError(f"{seg[0]} shrank while streaming")
+                remaining -= len(chunk)
+                yield chunk
+
+def layout_on_disk(layout) -> bool:
+    """Every file in the layout still exists with the size it was laid out with"""
+    for seg in layout:
+        if isinstance(seg, bytes):
+            continue
+        try:
+            if os.path.getsize(seg[0]) != seg[1]:
+                return False
+        except OSError:
+            return False
+    return True
+
+# (team_id, etag) → layout; building one reads every file, serving doesn't
+_zip_layouts = OrderedDict()
+
+async def cached_zip_layout(team_id: str, etag: str, entries):
+    key = (team_id, etag)
+    layout = _zip_layouts.get(key)
+    if layout is not None and not layout_on_disk(layout):
+        # a blob was released since it was cached
+        del _zip_layouts[key]
+        layout = None
+    if layout is None:
+        layout = await run_in_threadpool(zip_layout, entries)
+        _zip_layouts[key] = layout
+        while len(_zip_layouts) > ZIP_LAYOUT_CACHE_SIZE:
+            _zip_layouts.popitem(last=False)
+    else:
+        _zip_layouts.move_to_end(key)
+    return layout
+
+def content_disposition(filename: str, fallback: str) -> str:
+    """attachment header that survives non-latin-1 team names"""
+    if filename.isascii():
+        fallback = filename.replace('"', "")
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename)}"
+
+def zip_entries(submission: dict):
+    """(arcname, path, size, date_time) for files still on disk, names de-duplicated"""
+    submitted_at = submission.get("submitted_at") or datetime(1980, 1, 1)
+    date_time = max(submitted_at, datetime(1980, 1, 1)).timetuple()[:6]
+
+    entries, seen = [], {}
+    for f in submission.get("files", []):
+        path = url_to_path(f.get("url", ""))
+        if not os.path.isfile(path):
+            continue
+
+        name = os.path.basename(f.get("filename") or path)
+        stem, ext = os.path.splitext(name)
+        seen[name] = seen.get(name, 0) + 1
+        if seen[name] > 1:
+            name = f"{stem} ({seen[name]}){ext}"
+
+        entries.append((name, path, os.path.getsize(path), date_time))
+    return entries
+
 # ===================== SUBMISSION =====================
+def submission_response(team_id: str, submission: dict, resubmission_count: int):
+    return {
+        "team_id": team_id,
+        "review_status": "submitted",
+        "version": submission["version"],
+        "resubmission_count": resubmission_count,
+        "files_submitted": [
+            {**f, "url": sign_upload_url(f["url"])} for f in submission.get("files", [])
+        ]
+    }
+
+async def backfill_submission_counters():
+    """Seed teams.submission_seq from existing submissions (idempotent, run at startup)"""
+    team_ids = [
+        str(t["_id"])
+        async for t in teams_collection.find({"submission_seq": {"$exists": False}}, {"_id": 1})
+    ]
+    if not team_ids:
+        return
+
+    latest = {}
+    async for row in submissions_collection.aggregate([
+        {"$match": {"team_id": {"$in": team_ids}}},
+        {"$group": {"_id": "$team_id", "max_version": {"$max": "$version"}}}
+    ]):
+        latest[row["_id"]] = row["max_version"] or 0
+
+    for tid in team_ids:
+        await teams_collection.update_one(
+            {"_id": ObjectId(tid)},
+            {"$max": {"submission_seq": latest.get(tid, 0)}}
+        )
+
+ROLLBACK_FIELDS = ("review_status", "files_locked", "submission_seq", "latest_submission", "resubmission_count")
+
+async def rollback_team_update(team: dict, allocated_seq: int):
+    """Undo the submit step on `team` if nothing has moved it on since"""
+    restore = {f: team[f] for f in ROLLBACK_FIELDS if f in team}
+    missing = {f: "" for f in ROLLBACK_FIELDS if f not in team}
+    update = {"$set": restore}
+    if missing:
+        update["$unset"] = missing
+    await teams_collection.update_one({"_id": team["_id"], "submission_seq": allocated_seq}, update)
+
 @router.post("/submit-review/{team_id}")
-async def submit_review(team_id: str, user=Depends(get_current_user)):
+async def submit_review(
+    team_id: str,
+    user=Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None)
+):
+    try:
+        tid = ObjectId(team_id)
+    except:
+        raise HTTPException(400, "Invalid team id")
+
     # Fetch team
-    team = await teams_collection.find_one({"_id": ObjectId(team_id)})
+    team = await teams_collection.find_one({"_id": tid})
     if not team:
         raise HTTPException(404, "Team not found")
 
@@ -18,9 +229,19 @@ async def submit_review(team_id: str, user=Depends(get_current_user)):
     if str(team.get("creator_id")) != str(user["_id"]):
         raise HTTPException(403, "Only the team creator can submit")
 
+    # Client retry with the same key → replay the original result
+    if idempotency_key:
+        previous = await submissions_collection.find_one(
+            {"team_id": team_id, "idempotency_key": idempotency_key}
+        )
+        if previous:
+            return submission_response(team_id, previous, team.get("resubmission_count", 0))
+
     # Fetch uploaded files from team_files_collection
     uploaded_files = []
-    async for f in team_files_collection.find({"team_id": team_id}):
+    async for f in team_files_collection.find(
+        {"team_id": team_id}, {"filename": 1, "url": 1}
+    ):
         uploaded_files.append({
             "filename": f["filename"],
             "url": f["url"]
@@ -35,27 +256,12 @@ async def submit_review(team_id: str, user=Depends(get_current_user)):
     if review_status == "rejected" and resubmission_count >= 3:
         raise HTTPException(403, "Resubmission limit reached (3 attempts)")
 
-    # Update team status
-    update_fields = {
-        "review_status": "submitted",
-        "files_locked": True
-    }
-    if review_status == "rejected":
-        update_fields["resubmission_count"] = resubmission_count + 1
-
-    await teams_collection.update_one({"_id": ObjectId(team_id)}, {"$set": update_fields})
-
-    # Determine submission version
-    last_submission = await submissions_collection.find_one(
-        {"team_id": team_id},
-        sort=[("version", -1)]
-    )
-    version = last_submission["version"] + 1 if last_submission else 1
-
-    # Insert submission document
+    # Update team status, allocate the version and refresh the team's
+    # latest-submission summary in one atomic step. Matching on the status
+    # we validated makes a double-click lose here.
     submission_doc = {
+        "_id": ObjectId(),
         "team_id": team_id,
-        "version": version,
         "status": "submitted",
         "files": uploaded_files,
         "submitted_at": datetime.utcnow(),
@@ -63,18 +269,148 @@ async def submit_review(team_id: str, user=Depends(get_current_user)):
         "final_score": None,
         "rubric": None
     }
+    if idempotency_key:
+        submission_doc["idempotency_key"] = idempotency_key
 
-    await submissions_collection.insert_one(submission_doc)
-
-    return {
-        "team_id": str(team["_id"]),
+    next_version = {"$add": [{"$ifNull": ["$submission_seq", 0]}, 1]}
+    team_update = {
         "review_status": "submitted",
-        "resubmission_count": update_fields.get("resubmission_count", resubmission_count),
-        "files_submitted": uploaded_files
+        "files_locked": True,
+        "submission_seq": next_version,
+        "latest_submission": submission_summary({**submission_doc, "version": next_version}),
+    }
+    if review_status == "rejected":
+        team_update["resubmission_count"] = {"$add": [{"$ifNull": ["$resubmission_count", 0]}, 1]}
+
+    updated = await teams_collection.find_one_and_update(
+        {"_id": tid, "review_status": team.get("review_status")},
+        [{"$set": team_update}],
+        projection={"submission_seq": 1, "resubmission_count": 1},
+        return_document=ReturnDocument.AFTER
+    )
+
+    if not updated:
+        current = await teams_collection.find_one(
+            {"_id": tid}, {"review_status": 1, "submission_seq": 1, "resubmission_count": 1}
+        )
+        latest = await submissions_collection.find_one(
+            {"team_id": team_id, "version": (current or {}).get("submission_seq")}
+        )
+        if current and current.get("review_status") == "submitted" and latest:
+            return submission_response(team_id, latest, current.get("resubmission_count", 0))
+        raise HTTPException(409, "Submission already in progress")
+
+    submission_doc["version"] = updated["submission_seq"]
+
+    try:
+        await submissions_collection.insert_one(submission_doc)
+    except DuplicateKeyError:
+        # the version was never stored → put the team back as it was
+        await rollback_team_update(team, updated["submission_seq"])
+
+        # concurrent retry with the same key got there first
+        previous = None
+        if idempotency_key:
+            previous = await submissions_collection.find_one(
+                {"team_id": team_id, "idempotency_key": idempotency_key}
+            )
+        if not previous:
+            raise HTTPException(409, "Submission conflict, please retry")
+        return submission_response(team_id, previous, team.get("resubmission_count", 0))
+
+    return submission_response(team_id, submission_doc, updated.get("resubmission_count", 0))
+
+async def team_with_file_access(team_id: str, user: dict) -> dict:
+    """Team document if `user` may see its submitted files, else 400/403/404"""
+    try:
+        tid = ObjectId(team_id)
+    except:
+        raise HTTPException(400, "Invalid team id")
+
+    team = await teams_collection.find_one(
+        {"_id": tid},
+        {"team_name": 1, "creator_id": 1, "mentor_id": 1, "requested_mentor_id": 1, "members": 1}
+    )
+    if not team:
+        raise HTTPException(404, "Team not found")
+
+    # 🔐 Members, creator and mentor only
+    uid = str(user["_id"])
+    allowed = {team.get("creator_id"), team.get("mentor_id"), team.get("requested_mentor_id")}
+    allowed.update(m.get("id") for m in team.get("members", []))
+    if uid not in allowed:
+        raise HTTPException(403, "Access denied")
+    return team
+
+@router.get("/submission-zip/{team_id}/{version}")
+async def submission_zip(
+    team_id: str,
+    version: int,
+    request: Request,
+    user=Depends(get_current_user)
+):
+    team = await team_with_file_access(team_id, user)
+
+    submission = await submissions_collection.find_one(
+        {"team_id": team_id, "version": version},
+        {"files": 1, "submitted_at": 1}
+    )
+    if not submission:
+        raise HTTPException(404, "Submission not found")
+
+    entries = zip_entries(submission)
+    if not entries:
+        raise HTTPException(404, "No files available for this submission")
+
+    # Blob URLs embed the content hash, so names + URLs + sizes identify the bytes
+    fingerprint = hashlib.sha256()
+    for arcname, path, size, date_time in entries:
+        fingerprint.update(f"{arcname}|{path}|{size}|{date_time}\n".encode())
+    etag = f'"zip-{version}-{fingerprint.hexdigest()[:32]}"'
+
+    filename = f"{team.get('team_name') or team_id}-v{version}.zip"
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "private, no-cache",
+        "Content-Disposition": content_disposition(filename, f"{team_id}-v{version}.zip"),
     }
 
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in [t.strip() for t in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    try:
+        layout = await cached_zip_layout(team_id, etag, entries)
+    except OSError:
+        raise HTTPException(404, "Submission files are no longer available")
+    total = layout_length(layout)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if if_range and if_range.strip() != etag:
+        range_header = None
+
+    byte_range = parse_range(range_header, total)
+    if byte_range:
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{total}"
+        headers["Content-Length"] = str(end - start + 1)
+        return StreamingResponse(
+            layout_chunks(layout, start, end),
+            status_code=206,
+            media_type="application/zip",
+            headers=headers,
+        )
+
+    headers["Content-Length"] = str(total)
+    return StreamingResponse(layout_chunks(layout), media_type="application/zip", headers=headers)
+
 @router.get("/submissions/{team_id}")
 async def submissions(team_id: str, user=Depends(get_current_user)):
+    # signed URLs grant access to the files, so only hand them to the team
+    await team_with_file_access(team_id, user)
+
     subs = []
     async for s in submissions_collection.find(
         {"team_id": team_id}
@@ -83,7 +419,9 @@ async def submissions(team_id: str, user=Depends(get_current_user)):
             "id": str(s["_id"]),
             "version": s["version"],
             "status": s["status"],
-            "files": s.get("files", []),
+            "files": [
+                {**f, "url": sign_upload_url(f.get("url"))} for f in s.get("files", [])
+            ],
             "rubric": s.get("rubric"),
             "final_score": s.get("final_score"),
             "mentor_feedback": s.get("mentor_feedback"),
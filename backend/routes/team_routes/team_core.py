@@ -9,12 +9,11 @@ import re
 from database import (
     users_collection,
     teams_collection,
-    submissions_collection,
-    plagiarism_collection,
     sessions_collection
 )
 
 from routes.user_routes import get_current_user
+from utils.team_summary import team_summaries
 
 router = APIRouter()
 
@@ -81,6 +80,7 @@ async def build_team(req: TeamRequest, user=Depends(get_current_user)):
         "team_size": req.team_size,
         "members": [{"id": str(user["_id"]), "full_name": user["full_name"]}],
         "review_status": "not_submitted",
+        "submission_seq": 0,
         "created_at": datetime.utcnow()
     }
 
@@ -193,17 +193,8 @@ async def team_details(team_id: str, user=Depends(get_current_user)):
     if not (is_member or is_creator or is_mentor):
         raise HTTPException(status_code=403, detail="Access denied")
 
-    # 🔹 Latest submission
-    submission = await submissions_collection.find_one(
-        {"team_id": team_id},
-        sort=[("version", -1)]
-    )
-
-    # 🔹 Latest plagiarism
-    plagiarism = await plagiarism_collection.find_one(
-        {"team_id": team_id},
-        sort=[("checked_at", -1)]
-    )
+    # 🔹 Latest submission / plagiarism (summaries on the team document)
+    submission, plagiarism = await team_summaries(team)
 
     project_meta = team.get("project_meta", {})
 
@@ -236,12 +227,12 @@ async def team_details(team_id: str, user=Depends(get_current_user)):
         },
 
         "submission": {
-            "id": str(submission["_id"]),
+            "id": submission.get("id"),
             "version": submission.get("version"),
             "status": submission.get("status"),
-            "rubric": submission.get("rubric", {}),
+            "rubric": submission.get("rubric") or {},
             "final_score": submission.get("final_score"),
-            "mentor_feedback": submission.get("mentor_feedback", ""),
+            "mentor_feedback": submission.get("mentor_feedback") or "",
         } if submission else None,
 
         "plagiarism": {
@@ -0,0 +1,196 @@
+import mimetypes
+import os
+import re
+from email.utils import formatdate
+from typing import Optional
+
+import anyio
+from fastapi import APIRouter, HTTPException, Request
+from starlette.responses import Response
+
+from utils.auth import verify_upload_signature
+from utils.blob_store import UPLOAD_DIR, VARIANT_SUFFIXES, is_text_like
+
+router = APIRouter(tags=["Uploads"])
+
+CHUNK_SIZE = 256 * 1024
+IMMUTABLE_CACHE = "private, max-age=31536000, immutable"
+REVALIDATE_CACHE = "private, no-cache"
+
+# blobs/<aa>/<sha256>.ext  or  <uuid4>_<filename>
+BLOB_NAME = re.compile(r"^blobs/[0-9a-f]{2}/(?P<sha>[0-9a-f]{64})(\.[\w-]+)?$")
+UUID_NAME = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}_")
+RANGE_HEADER = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+UPLOAD_ROOT = os.path.realpath(UPLOAD_DIR)
+
+
+# ---------------- Helpers ----------------
+def resolve_upload(file_path: str) -> str:
+    """Map a URL path below /uploads to a file, refusing anything outside it"""
+    full_path = os.path.realpath(os.path.join(UPLOAD_ROOT, file_path))
+    if not full_path.startswith(UPLOAD_ROOT + os.sep) or not os.path.isfile(full_path):
+        raise HTTPException(status_code=404, detail="File not found")
+    return full_path
+
+
+def pick_encoding(full_path: str, accept_encoding: str):
+    """Choose a precompressed sibling the client accepts, if one exists"""
+    if not is_text_like(full_path):
+        return None, full_path
+
+    accepted = {part.split(";")[0].strip() for part in accept_encoding.split(",")}
+    for encoding, suffix in VARIANT_SUFFIXES.items():
+        if encoding in accepted and os.path.isfile(full_path + suffix):
+            return encoding, full_path + suffix
+    return None, full_path
+
+
+def parse_range(header: Optional[str], size: int):
+    """Return (start, end) for a single byte range, None to send everything.
+
+    Raises 416 for ranges that cannot be satisfied. Multi-range requests are
+    answered with the full body, which RFC 9110 allows.
+    """
+    if not header:
+        return None
+    match = RANGE_HEADER.match(header.strip())
+    if not match:
+        return None
+
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    elif last:
+        start = max(size - int(last), 0)
+        end = size - 1
+    else:
+        return None
+
+    if start >= size or start > end:
+        raise HTTPException(
+            status_code=416,
+            detail="Range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    return start, end
+
+
+class FileRangeResponse(Response):
+    """Send (part of) a file without buffering it in Python.
+
+    Uses the ASGI zero-copy extension (sendfile) when the server offers it,
+    path-send for whole files, and chunked reads otherwise.
+    """
+
+    def __init__(self, path: str, start: int, length: int, send_body: bool, headers: dict, **kwargs):
+        super().__init__(headers={**headers, "Content-Length": str(length)}, **kwargs)
+        self.path = path
+        self.start = start
+        self.length = length
+        self.send_body = send_body
+
+    async def __call__(self, scope, receive, send):
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+
+        if not self.send_body or self.length == 0:
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        extensions = scope.get("extensions", {})
+
+        if "http.response.zerocopysend" in extensions:
+            with open(self.path, "rb") as f:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": f,
+                    "offset": self.start,
+                    "count": self.length,
+                })
+            return
+
+        if "http.response.pathsend" in extensions and self.start == 0 \
+                and self.length == os.path.getsize(self.path):
+            await send({"type": "http.response.pathsend", "path": self.path})
+            return
+
+        remaining = self.length
+        async with await anyio.open_file(self.path, mode="rb") as f:
+            await f.seek(self.start)
+            while remaining:
+                chunk = await f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({
+                    "type": "http.response.body",
+                    "body": chunk,
+                    "more_body": remaining > 0,
+                })
+        if remaining:
+            await send({"type": "http.response.body", "body": b""})
+
+
+# ---------------- Serve Upload ----------------
+@router.api_route("/uploads/{file_path:path}", methods=["GET", "HEAD"])
+async def serve_upload(file_path: str, request: Request, expires: int = 0, sig: str = ""):
+    # 🔐 Signed by the listing endpoints, so no DB lookup or file read here
+    if not verify_upload_signature(f"/uploads/{file_path}", expires, sig):
+        raise HTTPException(status_code=403, detail="Invalid or expired link")
+
+    full_path = resolve_upload(file_path)
+    encoding, send_path = pick_encoding(full_path, request.headers.get("accept-encoding", ""))
+    stat = os.stat(send_path)
+
+    blob_match = BLOB_NAME.match(file_path)
+    immutable = bool(blob_match or UUID_NAME.match(os.path.basename(file_path)))
+    if blob_match:
+        etag = f'"{blob_match.group("sha")}{"-" + encoding if encoding else ""}"'
+    else:
+        etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}{"-" + encoding if encoding else ""}"'
+
+    headers = {
+        "ETag": etag,
+        "Cache-Control": IMMUTABLE_CACHE if immutable else REVALIDATE_CACHE,
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+        "Accept-Ranges": "bytes",
+    }
+    if is_text_like(full_path):
+        headers["Vary"] = "Accept-Encoding"
+    if encoding:
+        headers["Content-Encoding"] = encoding
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in [t.strip() for t in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    # If-Range with a stale validator → send the whole file
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if if_range and if_range.strip() != etag:
+        range_header = None
+
+    byte_range = parse_range(range_header, stat.st_size)
+    if byte_range:
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+    else:
+        start, end = 0, stat.st_size - 1
+        status_code = 200
+
+    media_type, _ = mimetypes.guess_type(full_path)
+    return FileRangeResponse(
+        send_path,
+        start=start,
+        length=end - start + 1,
+        send_body=request.method != "HEAD",
+        status_code=status_code,
+        headers=headers,
+        media_type=media_type or "application/octet-stream",
+    )
@@ -48,6 +48,15 @@ async def get_current_user(authorization: Optional[str] = Header(None)):
 
     return user
 
+async def get_optional_user(authorization: Optional[str] = Header(None)):
+    """Like get_current_user, but anonymous callers get None instead of 401"""
+    if not authorization:
+        return None
+    try:
+        return await get_current_user(authorization)
+    except HTTPException:
+        return None
+
 # ----------------- Routes -----------------
 # Profile
 @router.get("/profile", response_model=UserOut)
@@ -0,0 +1,198 @@
+# scripts/ai_load_test.py
+#
+# Offline load test for the AI routes. Drives the real FastAPI app in
+# process (httpx ASGI transport) with the stub LLM backend
+# (utils/llm_stub.py), so handlers run for real: auth, MongoDB reads and
+# writes, prompt cache, response parsing. Reports:
+#   - throughput and end-to-end latency per endpoint
+#   - event-loop lag: how late a 10 ms ticker wakes up while the load runs
+#     (anything beyond a few ms means something in a handler is blocking)
+#   - responses that came back with an error or the route's fallback
+#
+# Needs MongoDB (throwaway users / posts are created and removed again).
+#
+#   cd backend && LLM_BACKEND=stub LLM_STUB_LATENCY=lognormal:300,0.5 \
+#       python -m scripts.ai_load_test --requests 500 --concurrency 50
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from datetime import datetime
+
+import httpx
+from bson import ObjectId
+
+from database import users_collection, career_coach_collection, community_collection
+from main import app
+from utils import llm_gateway
+from utils.auth import create_access_token
+from utils.community_enrichment import enrichment_worker
+
+TICK_SECONDS = 0.01
+
+NAMES = ["Asha", "Ravi", "Meena", "Karthik", "Divya", "Arjun"]
+ROLES = ["Backend Developer", "Data Analyst", "ML Engineer", "Frontend Developer"]
+SKILLS = ["Python", "SQL", "React", "Docker", "Java", "Statistics", "Git"]
+
+
+# ---------------- Scenarios ----------------
+# each returns (method, path, json body) and a check on the parsed response
+def career_insights(i):
+    return ("GET", "/api/careercoach/insights?refresh=true", None,
+            lambda body: "Career Readiness Score" in body.get("ai_message", ""))
+
+
+def future_story(i):
+    body = {
+        "interest_role": random.choice(ROLES),
+        "dream_company_type": "Product startup",
+        "time_horizon": "1 year",
+        "current_struggle": f"Finding time to practice ({i})",
+    }
+    return ("POST", "/api/future-story/generate", body,
+            lambda res: len((res.get("data") or {}).get("action_steps", [])) == 5)
+
+
+def reply_suggestion(i):
+    body = {"content": f"How do I prepare for a {random.choice(ROLES)} interview? ({i})"}
+    # the handler falls back to a canned sentence when the LLM path fails
+    return ("POST", "/api/community/ai-reply-suggestion", body,
+            lambda res: not res.get("suggested_reply", "").startswith("This is an interesting point"))
+
+
+def community_post(i):
+    body = {"content": f"Load test post {i}: sharing my {random.choice(SKILLS)} learning plan"}
+    return ("POST", "/api/community/post", body, lambda res: "message" in res)
+
+
+SCENARIOS = {
+    "career.insights": career_insights,
+    "future_story.generate": future_story,
+    "community.reply": reply_suggestion,
+    "community.post": community_post,  # enriched in batches by the worker
+}
+
+
+# ---------------- Fixtures ----------------
+async def create_users(count: int):
+    docs = [
+        {
+            "_id": ObjectId(),
+            "name": random.choice(NAMES),
+            "full_name": "Load Test User",
+            "email": f"loadtest-{ObjectId()}@example.invalid",
+            "role": "student",
+            "skills": random.sample(SKILLS, 3),
+            "interests": ["AI", "Web Development"],
+            "goals": "Get a first developer job",
+            "experience": "Beginner",
+            "load_test": True,
+            "created_at": datetime.utcnow(),
+        }
+        for _ in range(count)
+    ]
+    await users_collection.insert_many(docs)
+    return [create_access_token({"user_id": str(d["_id"]), "role": "student"}) for d in docs], docs
+
+
+async def cleanup(users):
+    ids = [u["_id"] for u in users]
+    await community_collection.delete_many({"author_id": {"$in": ids}})
+    await career_coach_collection.delete_many({"user_id": {"$in": [str(i) for i in ids]}})
+    await users_collection.delete_many({"_id": {"$in": ids}})
+
+
+# ---------------- Measurements ----------------
+async def watch_loop_lag(samples: list, stop: asyncio.Event):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK_SECONDS)
+        samples.append(time.perf_counter() - start - TICK_SECONDS)
+
+
+def ms(samples) -> str:
+    if not samples:
+        return "n/a"
+    samples = sorted(samples)
+    p95 = samples[max(int(len(samples) * 0.95) - 1, 0)]
+    return (f"p50={statistics.median(samples) * 1000:.1f}ms p95={p95 * 1000:.1f}ms "
+            f"max={samples[-1] * 1000:.1f}ms")
+
+
+async def main(args):
+    if llm_gateway.backend.name != "stub":
+        print("⚠️ LLM_BACKEND is not 'stub' – this run will call the live API")
+
+    scenarios = args.scenarios or list(SCENARIOS)
+    latencies = {name: [] for name in scenarios}
+    failures = {name: 0 for name in scenarios}
+    bad_response = {name: 0 for name in scenarios}
+
+    tokens, users = await create_users(args.users)
+    queue = asyncio.Queue()
+    for i in range(args.requests):
+        queue.put_nowait((random.choice(scenarios), i))
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=60) as client:
+
+        async def worker():
+            while not queue.empty():
+                name, i = queue.get_nowait()
+                method, path, body, check = SCENARIOS[name](i)
+                headers = {"Authorization": f"Bearer {random.choice(tokens)}"}
+                start = time.perf_counter()
+                response = await client.request(method, path, json=body, headers=headers)
+                elapsed = time.perf_counter() - start
+                if response.status_code != 200:
+                    failures[name] += 1
+                    continue
+                latencies[name].append(elapsed)
+                try:
+                    ok = check(response.json())
+                except ValueError:
+                    ok = False
+                bad_response[name] += not ok
+
+        lag, stop = [], asyncio.Event()
+        watcher = asyncio.create_task(watch_loop_lag(lag, stop))
+        enricher = asyncio.create_task(enrichment_worker())  # normally started with the app
+        start = time.perf_counter()
+        try:
+            await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+            elapsed = time.perf_counter() - start
+        finally:
+            stop.set()
+            await watcher
+            enricher.cancel()
+            if not args.keep:
+                await cleanup(users)
+
+    done = sum(len(v) for v in latencies.values())
+    print(f"\n{args.requests} requests, concurrency {args.concurrency}, "
+          f"gateway limit {llm_gateway.LLM_MAX_CONCURRENCY}, backend {llm_gateway.backend.name}")
+    print(f"  throughput: {done / elapsed:.1f} req/s over {elapsed:.1f}s")
+    print(f"  event-loop lag: {ms(lag)}")
+    for name in scenarios:
+        print(f"  {name:<24} n={len(latencies[name]):<5} {ms(latencies[name])} "
+              f"failed={failures[name]} bad_response={bad_response[name]}")
+
+    if args.metrics:
+        print(json.dumps(llm_gateway.metrics_snapshot(), indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline load test for the AI routes")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50, help="simultaneous clients")
+    parser.add_argument("--users", type=int, default=20, help="throwaway users to spread requests over")
+    parser.add_argument("--scenarios", nargs="*", choices=list(SCENARIOS), help="subset (default: all)")
+    parser.add_argument("--keep", action="store_true", help="keep the created users / posts")
+    parser.add_argument("--metrics", action="store_true", help="also dump the gateway metrics")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    random.seed(args.seed)
+    asyncio.run(main(args))
@@ -0,0 +1,139 @@
+# scripts/chat_storage_benchmark.py
+#
+# Compares the per-message and bucketed chat layouts (utils/chat_store.py)
+# on throwaway collections in the configured database:
+#   - storage + index size after loading the same history into both
+#   - single-message append latency
+#   - latest-page and scroll-back-through-everything read latency
+#
+#   cd backend && python -m scripts.chat_storage_benchmark --teams 20 --messages 5000
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from config import CHAT_BUCKET_WINDOW_HOURS, CHAT_BUCKET_MAX_MESSAGES
+from database import db
+from utils.chat_store import MessageStore, BucketStore, migrate_to_buckets
+
+WORDS = "the team pushed a fix for the api review demo deadline mentor rubric tests ui".split()
+
+
+def fake_history(team_id: str, count: int):
+    ts = datetime.utcnow() - timedelta(days=90)
+    for _ in range(count):
+        ts += timedelta(seconds=random.randint(5, 3600))
+        yield {
+            "_id": ObjectId(),
+            "team_id": team_id,
+            "sender_id": str(ObjectId()),
+            "sender_name": "Bench User",
+            "text": " ".join(random.choices(WORDS, k=random.randint(3, 25))),
+            "timestamp": ts,
+        }
+
+
+async def coll_stats(name: str) -> dict:
+    stats = await db.command("collStats", name)
+    return {
+        "documents": stats.get("count", 0),
+        "data_kb": stats.get("size", 0) // 1024,
+        "storage_kb": stats.get("storageSize", 0) // 1024,
+        "index_kb": stats.get("totalIndexSize", 0) // 1024,
+    }
+
+
+def ms(samples) -> str:
+    samples = sorted(samples)
+    p95 = samples[max(int(len(samples) * 0.95) - 1, 0)]
+    return f"p50={statistics.median(samples) * 1000:.2f}ms p95={p95 * 1000:.2f}ms"
+
+
+async def time_latest_pages(store, team_ids, page_size: int, rounds: int):
+    samples = []
+    for _ in range(rounds):
+        team_id = random.choice(team_ids)
+        start = time.perf_counter()
+        await store.page(team_id, limit=page_size)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+async def time_full_scroll(store, team_id: str, page_size: int):
+    start = time.perf_counter()
+    before, pages, has_more = None, 0, True
+    while has_more:
+        docs, has_more = await store.page(team_id, before=before, limit=page_size)
+        pages += 1
+        if docs:
+            before = (docs[0]["timestamp"], docs[0]["_id"])
+    return time.perf_counter() - start, pages
+
+
+async def time_appends(store, team_id: str, count: int):
+    samples = []
+    ts = datetime.utcnow()
+    for i in range(count):
+        message = {"sender_id": "bench", "sender_name": "Bench User",
+                   "text": f"append {i}", "timestamp": ts + timedelta(seconds=i)}
+        start = time.perf_counter()
+        await store.append(team_id, message)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+async def main(args):
+    messages = db.get_collection("bench_chat_messages")
+    buckets = db.get_collection("bench_chat_buckets")
+    await messages.drop()
+    await buckets.drop()
+
+    # same indexes as database.ensure_indexes()
+    await messages.create_index([("team_id", 1), ("timestamp", 1), ("_id", 1)])
+    await buckets.create_index([("team_id", 1), ("window", 1), ("count", 1)])
+    await buckets.create_index([("team_id", 1), ("end", -1)])
+    await buckets.create_index([("team_id", 1), ("start", 1)])
+
+    message_store = MessageStore(messages)
+    bucket_store = BucketStore(buckets, CHAT_BUCKET_WINDOW_HOURS, CHAT_BUCKET_MAX_MESSAGES)
+    team_ids = [str(ObjectId()) for _ in range(args.teams)]
+
+    print(f"Loading {args.teams} teams × {args.messages} messages …")
+    for team_id in team_ids:
+        history = list(fake_history(team_id, args.messages))
+        for i in range(0, len(history), 1000):
+            await messages.insert_many(history[i:i + 1000], ordered=False)
+    await migrate_to_buckets(source=messages, target=bucket_store)
+
+    try:
+        for label, store, name in (("messages", message_store, "bench_chat_messages"),
+                                   ("buckets", bucket_store, "bench_chat_buckets")):
+            stats = await coll_stats(name)
+            latest = await time_latest_pages(store, team_ids, args.page_size, args.rounds)
+            scroll, pages = await time_full_scroll(store, team_ids[0], args.page_size)
+            appends = await time_appends(store, team_ids[-1], args.appends)
+            print(f"\n== {label} ==")
+            print("  " + "  ".join(f"{k}={v}" for k, v in stats.items()))
+            print(f"  latest page ({args.page_size}): {ms(latest)}")
+            print(f"  full scroll-back: {scroll * 1000:.0f}ms over {pages} pages")
+            print(f"  append: {ms(appends)}")
+    finally:
+        if not args.keep:
+            await messages.drop()
+            await buckets.drop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark team chat storage layouts")
+    parser.add_argument("--teams", type=int, default=20)
+    parser.add_argument("--messages", type=int, default=5000, help="messages per team")
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=200, help="latest-page reads to time")
+    parser.add_argument("--appends", type=int, default=200)
+    parser.add_argument("--keep", action="store_true", help="keep the bench collections")
+    asyncio.run(main(parser.parse_args()))
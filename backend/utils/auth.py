@@ -3,6 +3,9 @@
 from argon2 import PasswordHasher
 from argon2.exceptions import VerifyMismatchError
 from datetime import datetime, timedelta
+import hashlib
+import hmac
+import time
 import jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
@@ -43,6 +46,31 @@ def decode_access_token(token: str):
     except jwt.InvalidTokenError:
         return None
 
+# ---------------- Signed Upload URLs ----------------
+UPLOAD_URL_TTL_DAYS = 1
+
+def _upload_signature(path: str, expires: int) -> str:
+    message = f"{path}:{expires}".encode()
+    return hmac.new(JWT_SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()[:32]
+
+def sign_upload_url(url: str) -> str:
+    """Append an expiring signature to an /uploads URL.
+
+    Expiry is rounded up to a day boundary so the signed URL stays stable
+    (and browser-cacheable) for at least UPLOAD_URL_TTL_DAYS.
+    """
+    if not url or not url.startswith("/uploads/"):
+        return url
+    day = 24 * 60 * 60
+    expires = (int(time.time()) // day + UPLOAD_URL_TTL_DAYS + 1) * day
+    return f"{url}?expires={expires}&sig={_upload_signature(url, expires)}"
+
+def verify_upload_signature(url: str, expires: int, sig: str) -> bool:
+    """Check a signature produced by sign_upload_url"""
+    if not sig or expires < time.time():
+        return False
+    return hmac.compare_digest(_upload_signature(url, expires), sig)
+
 # ---------------- OAuth2 Dependency ----------------
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
@@ -0,0 +1,394 @@
+# utils/blob_store.py
+
+import asyncio
+import gzip
+import hashlib
+import mimetypes
+import os
+import uuid
+import zlib
+from datetime import datetime
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from database import (
+    blobs_collection,
+    file_texts_collection,
+    team_files_collection,
+    submissions_collection,
+)
+
+# ---------------- Layout ----------------
+# Uploaded bytes live once per SHA-256 under uploads/blobs/<aa>/<sha><ext>.
+# team_files documents point at a blob through "blob_id"; the blob document
+# keeps the reference count. Extracted text is cached per blob, compressed,
+# in file_texts (same _id) so file listings never carry it.
+UPLOAD_DIR = "uploads"
+BLOB_DIR = os.path.join(UPLOAD_DIR, "blobs")
+CHUNK_SIZE = 1024 * 1024
+
+os.makedirs(BLOB_DIR, exist_ok=True)
+
+# Precompressed siblings served by routes/uploads_routes.py
+VARIANT_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+TEXT_LIKE_TYPES = {
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+}
+
+try:
+    import brotli
+except ImportError:  # optional, gzip alone is fine
+    brotli = None
+
+
+def blob_path(blob_id: str, ext: str = "") -> str:
+    """Relative on-disk path of a blob (also its URL below /uploads)"""
+    return os.path.join(BLOB_DIR, blob_id[:2], f"{blob_id}{ext}")
+
+
+def path_to_url(path: str) -> str:
+    return "/" + path.replace(os.sep, "/")
+
+
+def url_to_path(url: str) -> str:
+    return url.lstrip("/").replace("/", os.sep)
+
+
+# ---------------- Deferred Removal ----------------
+# Request handlers only enqueue paths; removal_worker() (started with the
+# app) deletes them off the event loop. Anything lost on a crash is found
+# again by the garbage collector in utils/upload_gc.py.
+#
+# Identical bytes may be uploaded again between release_blob() and the
+# removal, so the worker only deletes a blob file while no blob document
+# points at it, re-checking after moving it aside.
+_removal_queue: asyncio.Queue = asyncio.Queue()
+
+
+def schedule_removal(*paths: str):
+    for path in paths:
+        _removal_queue.put_nowait(path)
+
+
+def remove_quietly(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _variant_base(path: str) -> str:
+    for suffix in VARIANT_SUFFIXES.values():
+        if path.endswith(suffix):
+            return path[:-len(suffix)]
+    return path
+
+
+async def _blob_in_use(path: str) -> bool:
+    return await blobs_collection.find_one({"path": _variant_base(path)}, {"_id": 1}) is not None
+
+
+async def remove_unless_reacquired(path: str):
+    if await _blob_in_use(path):
+        return
+    # ".tmp-" so upload_gc reclaims it if we crash in between
+    aside = f"{path}.tmp-del-{uuid.uuid4().hex}"
+    try:
+        await asyncio.to_thread(os.replace, path, aside)
+    except FileNotFoundError:
+        return
+    if await _blob_in_use(path) and not os.path.exists(path):
+        # re-uploaded meanwhile and its copy is the one we moved → put it back
+        await asyncio.to_thread(os.replace, aside, path)
+        return
+    await asyncio.to_thread(remove_quietly, aside)
+
+
+async def removal_worker():
+    while True:
+        path = await _removal_queue.get()
+        try:
+            await remove_unless_reacquired(path)
+        except Exception as e:
+            print("Deferred removal failed:", path, e)
+        finally:
+            _removal_queue.task_done()
+
+
+# ---------------- Store ----------------
+async def _acquire(blob_id: str, ext: str, size: int, content_type):
+    """Take a reference on a blob, creating its document on first use"""
+    update = {
+        "$inc": {"refcount": 1},
+        "$set": {"last_acquired_at": datetime.utcnow()},
+        "$setOnInsert": {
+            "path": blob_path(blob_id, ext),
+            "size": size,
+            "content_type": content_type,
+            "created_at": datetime.utcnow(),
+        },
+    }
+    try:
+        return await blobs_collection.find_one_and_update(
+            {"_id": blob_id}, update, upsert=True, return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        # lost the upsert race against an identical upload → plain increment
+        return await blobs_collection.find_one_and_update(
+            {"_id": blob_id}, update, return_document=ReturnDocument.AFTER
+        )
+
+
+async def store_upload(file) -> dict:
+    """Stream an UploadFile into the blob store and return its blob document.
+
+    The caller owns one reference on the returned blob and must hand it back
+    with release_blob() when the file record pointing at it goes away.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    tmp_path = os.path.join(BLOB_DIR, f".tmp-{uuid.uuid4().hex}")
+
+    with open(tmp_path, "wb") as out:
+        while True:
+            chunk = await file.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            out.write(chunk)
+            size += len(chunk)
+
+    blob_id = digest.hexdigest()
+    ext = os.path.splitext(file.filename or "")[1].lower()
+    blob = await _acquire(blob_id, ext, size, file.content_type)
+
+    # same bytes already on disk → drop the temp copy, unless this upload
+    # (re)created the document: the old file may still be queued for removal
+    if blob["refcount"] > 1 and os.path.exists(blob["path"]):
+        os.remove(tmp_path)
+    else:
+        os.makedirs(os.path.dirname(blob["path"]), exist_ok=True)
+        os.replace(tmp_path, blob["path"])
+
+    return blob
+
+
+def is_text_like(path: str) -> bool:
+    content_type, _ = mimetypes.guess_type(path)
+    return bool(content_type) and (
+        content_type.startswith("text/") or content_type in TEXT_LIKE_TYPES
+    )
+
+
+def write_compressed_variants(path: str):
+    """Write .gz (and .br when brotli is installed) next to a text-like blob.
+
+    Variants that would not save at least 10% are skipped.
+    """
+    if not is_text_like(path):
+        return
+
+    encoders = {"gzip": lambda data: gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        encoders["br"] = brotli.compress
+
+    with open(path, "rb") as src:
+        data = src.read()
+
+    for encoding, encode in encoders.items():
+        variant = path + VARIANT_SUFFIXES[encoding]
+        if os.path.exists(variant):
+            continue
+        compressed = encode(data)
+        if len(compressed) >= len(data) * 0.9:
+            continue
+        tmp_path = f"{variant}.tmp-{uuid.uuid4().hex}"
+        with open(tmp_path, "wb") as out:
+            out.write(compressed)
+        os.replace(tmp_path, variant)
+
+
+# ---------------- Extracted Text ----------------
+async def has_blob_text(blob_id: str) -> bool:
+    return await file_texts_collection.find_one({"_id": blob_id}, {"_id": 1}) is not None
+
+
+async def set_blob_text(blob_id: str, text: str):
+    """Cache the text extraction result for a blob (zlib-compressed)"""
+    await file_texts_collection.update_one(
+        {"_id": blob_id},
+        {"$set": {
+            "data": zlib.compress(text.encode("utf-8")),
+            "length": len(text),
+            "updated_at": datetime.utcnow(),
+        }},
+        upsert=True
+    )
+
+
+async def iter_blob_texts(blob_ids, batch_size: int = 100):
+    """Yield (blob_id, text) for the given blobs, skipping empty texts"""
+    cursor = file_texts_collection.find(
+        {"_id": {"$in": list(blob_ids)}, "length": {"$gt": 0}},
+        batch_size=batch_size
+    )
+    async for doc in cursor:
+        yield doc["_id"], zlib.decompress(doc["data"]).decode("utf-8")
+
+
+async def release_blob(blob_id: str) -> bool:
+    """Drop one reference; remove the blob once nobody points at it.
+
+    Returns True when the blob itself was deleted.
+    """
+    blob = await blobs_collection.find_one_and_update(
+        {"_id": blob_id},
+        {"$inc": {"refcount": -1}},
+        return_document=ReturnDocument.AFTER,
+    )
+    if not blob or blob.get("refcount", 0) > 0:
+        return False
+
+    # only delete if no upload re-acquired it in the meantime
+    result = await blobs_collection.delete_one({"_id": blob_id, "refcount": {"$lte": 0}})
+    if not result.deleted_count:
+        return False
+    await file_texts_collection.delete_one({"_id": blob_id})
+
+    schedule_removal(blob["path"], *(blob["path"] + s for s in VARIANT_SUFFIXES.values()))
+    return True
+
+
+# ---------------- Migration ----------------
+async def _acquire_once(blob_id: str, ext: str, size: int, content_type, file_id) -> dict:
+    """Take the reference for one migrated team_files record, at most once.
+
+    The record's id is remembered on the blob (legacy_refs), so re-running
+    after a crash never counts the same record twice.
+    """
+    await blobs_collection.update_one(
+        {"_id": blob_id},
+        {"$setOnInsert": {
+            "path": blob_path(blob_id, ext),
+            "size": size,
+            "content_type": content_type,
+            "refcount": 0,
+            "created_at": datetime.utcnow(),
+        }},
+        upsert=True,
+    )
+    await blobs_collection.update_one(
+        {"_id": blob_id, "legacy_refs": {"$ne": file_id}},
+        {"$inc": {"refcount": 1}, "$addToSet": {"legacy_refs": file_id},
+         "$set": {"last_acquired_at": datetime.utcnow()}},
+    )
+    return await blobs_collection.find_one({"_id": blob_id})
+
+
+def _hash_file(path: str):
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as src:
+        for chunk in iter(lambda: src.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+async def migrate_legacy_files():
+    """Move uploads/{uuid}_{filename} files into the blob store.
+
+    Rewrites team_files and submission snapshots to the blob URL and carries
+    any already-extracted text over to the blob. Every step is idempotent
+    and the record is rewritten (keeping legacy_url) before its file moves,
+    so a run interrupted at any point is finished by the next one.
+    """
+    moved = deduped = missing = 0
+
+    async for f in team_files_collection.find(
+        {"$or": [{"blob_id": {"$exists": False}}, {"legacy_url": {"$exists": True}}]}
+    ):
+        legacy_url = f.get("legacy_url") or f["url"]
+        legacy_path = url_to_path(legacy_url)
+
+        if "blob_id" in f:
+            # interrupted after the rewrite: the blob reference is taken
+            blob = await blobs_collection.find_one({"_id": f["blob_id"]})
+            if not blob:
+                missing += 1
+                continue
+        else:
+            if not os.path.exists(legacy_path):
+                missing += 1
+                continue
+            blob_id, size = await asyncio.to_thread(_hash_file, legacy_path)
+            ext = os.path.splitext(f.get("filename") or "")[1].lower()
+            blob = await _acquire_once(blob_id, ext, size, f.get("file_type"), f["_id"])
+
+            if isinstance(f.get("text"), str) and not await has_blob_text(blob_id):
+                await set_blob_text(blob_id, f["text"])
+
+            # 1️⃣ record first: from here on a rerun knows where the file goes
+            await team_files_collection.update_one(
+                {"_id": f["_id"]},
+                {"$set": {"blob_id": blob_id, "url": path_to_url(blob["path"]), "legacy_url": legacy_url},
+                 "$unset": {"text": ""}}
+            )
+
+        # 2️⃣ then the file
+        if os.path.exists(legacy_path):
+            if os.path.exists(blob["path"]):
+                os.remove(legacy_path)
+                deduped += 1
+            else:
+                os.makedirs(os.path.dirname(blob["path"]), exist_ok=True)
+                os.replace(legacy_path, blob["path"])
+                moved += 1
+
+        # 3️⃣ submission snapshots, then mark the record done
+        new_url = path_to_url(blob["path"])
+        await submissions_collection.update_many(
+            {"files.url": legacy_url},
+            {"$set": {"files.$[file].url": new_url}},
+            array_filters=[{"file.url": legacy_url}]
+        )
+        await team_files_collection.update_one({"_id": f["_id"]}, {"$unset": {"legacy_url": ""}})
+
+    return {"moved": moved, "deduplicated": deduped, "missing_on_disk": missing}
+
+
+async def migrate_inline_texts():
+    """Move "text" embedded in blob and team_files documents into file_texts.
+
+    Records without a blob (file missing on disk) keep their inline text.
+    """
+    moved = 0
+
+    async for blob in blobs_collection.find({"text": {"$exists": True}}, {"text": 1}):
+        if not await has_blob_text(blob["_id"]):
+            await set_blob_text(blob["_id"], blob["text"] or "")
+            moved += 1
+        await blobs_collection.update_one({"_id": blob["_id"]}, {"$unset": {"text": ""}})
+
+    async for f in team_files_collection.find(
+        {"blob_id": {"$exists": True}, "text": {"$exists": True}},
+        {"blob_id": 1, "text": 1}
+    ):
+        if not await has_blob_text(f["blob_id"]):
+            await set_blob_text(f["blob_id"], f["text"] or "")
+            moved += 1
+        await team_files_collection.update_one({"_id": f["_id"]}, {"$unset": {"text": ""}})
+
+    return {"texts_moved": moved}
+
+
+async def _migrate():
+    print(await migrate_legacy_files())
+    print(await migrate_inline_texts())
+
+
+if __name__ == "__main__":
+    asyncio.run(_migrate())
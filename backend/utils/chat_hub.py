@@ -0,0 +1,199 @@
+# utils/chat_hub.py
+#
+# In-process pub/sub for team chat WebSockets.
+#
+# Each connected socket is a Subscriber with a bounded queue. Publishing
+# fans a message out to the local subscribers of that team and hands it to
+# a Broker so other uvicorn workers can do the same. Messages are persisted
+# by the worker that received them, never by the broker.
+#
+# Brokers:
+#   LocalBroker   – single process, nothing to share (default)
+#   SocketBroker  – talks to a local relay so several workers share channels
+#                   CHAT_BROKER_URL=unix:///tmp/skillsync-chat.sock
+#                   python -m utils.chat_hub relay /tmp/skillsync-chat.sock
+
+import asyncio
+import json
+import sys
+import uuid
+
+from config import CHAT_BROKER_URL, CHAT_SUBSCRIBER_QUEUE_SIZE
+
+LINE_LIMIT = 1024 * 1024  # longest relayed message (one JSON line)
+RELAY_OUTBOX_SIZE = 1000
+
+
+# ---------------- Brokers ----------------
+class Broker:
+    """Carries (channel, payload) between processes.
+
+    start() receives a callback that must be called for every message
+    published by *other* processes; local delivery is the hub's job.
+    """
+
+    async def start(self, deliver):
+        self.deliver = deliver
+
+    async def publish(self, channel: str, payload: dict):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class LocalBroker(Broker):
+    async def publish(self, channel: str, payload: dict):
+        pass  # no other processes to tell
+
+
+class SocketBroker(Broker):
+    """Newline-delimited JSON over a Unix socket relay, reconnecting on loss"""
+
+    RECONNECT_SECONDS = 2
+
+    def __init__(self, path: str):
+        self.path = path
+        self.writer = None
+        self.task = None
+
+    async def start(self, deliver):
+        await super().start(deliver)
+        self.task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                reader, self.writer = await asyncio.open_unix_connection(self.path, limit=LINE_LIMIT)
+                while line := await reader.readline():
+                    try:
+                        event = json.loads(line)
+                        self.deliver(event["channel"], event["payload"])
+                    except (ValueError, KeyError, TypeError) as e:
+                        print("Chat broker: skipping bad frame:", e)
+            except Exception as e:
+                # anything else (reset, overlong line, …) → log and reconnect
+                print("Chat broker connection lost:", repr(e))
+            finally:
+                if self.writer is not None:
+                    self.writer.close()
+                self.writer = None
+            await asyncio.sleep(self.RECONNECT_SECONDS)
+
+    async def publish(self, channel: str, payload: dict):
+        writer = self.writer
+        if writer is None:
+            return  # relay down → other workers miss it, history still has it
+        line = json.dumps({"channel": channel, "payload": payload}, default=str) + "\n"
+        try:
+            writer.write(line.encode())
+            await writer.drain()
+        except Exception as e:
+            # the message is already saved; closing the writer makes _run reconnect
+            print("Chat broker publish failed:", repr(e))
+            writer.close()
+
+    async def close(self):
+        if self.task:
+            self.task.cancel()
+
+
+async def run_relay(path: str):
+    """Stand-in broker: forwards every line to all other connected workers.
+
+    Each worker gets a bounded outbox drained by its own sender task, so a
+    slow worker can't grow the relay's buffers; one that falls
+    RELAY_OUTBOX_SIZE lines behind is disconnected and reconnects.
+    """
+    clients = {}  # writer → outbox
+
+    async def send(writer, outbox):
+        while True:
+            writer.write(await outbox.get())
+            await writer.drain()
+
+    async def handle(reader, writer):
+        outbox = asyncio.Queue(maxsize=RELAY_OUTBOX_SIZE)
+        clients[writer] = outbox
+        sender = asyncio.create_task(send(writer, outbox))
+        try:
+            while line := await reader.readline():
+                for other, other_outbox in list(clients.items()):
+                    if other is writer:
+                        continue
+                    try:
+                        other_outbox.put_nowait(line)
+                    except asyncio.QueueFull:
+                        print("Chat relay: dropping a worker that fell behind")
+                        clients.pop(other, None)
+                        other.close()
+        except Exception as e:
+            print("Chat relay client error:", repr(e))
+        finally:
+            clients.pop(writer, None)
+            sender.cancel()
+            writer.close()
+
+    server = await asyncio.start_unix_server(handle, path=path, limit=LINE_LIMIT)
+    print("Chat relay listening on", path)
+    async with server:
+        await server.serve_forever()
+
+
+def make_broker(url: str) -> Broker:
+    if url and url.startswith("unix://"):
+        return SocketBroker(url[len("unix://"):])
+    return LocalBroker()
+
+
+# ---------------- Hub ----------------
+class Subscriber:
+    def __init__(self, queue_size: int):
+        self.id = uuid.uuid4().hex
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        # set when the client fell too far behind; the socket gets closed
+        self.overflowed = asyncio.Event()
+
+
+class ChatHub:
+    def __init__(self, broker: Broker, queue_size: int):
+        self.broker = broker
+        self.queue_size = queue_size
+        self.channels = {}
+
+    async def start(self):
+        await self.broker.start(self._fan_out)
+
+    def subscribe(self, channel: str) -> Subscriber:
+        sub = Subscriber(self.queue_size)
+        self.channels.setdefault(channel, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, channel: str, sub: Subscriber):
+        subs = self.channels.get(channel)
+        if subs:
+            subs.discard(sub)
+            if not subs:
+                del self.channels[channel]
+
+    async def publish(self, channel: str, payload: dict):
+        self._fan_out(channel, payload)
+        await self.broker.publish(channel, payload)
+
+    def _fan_out(self, channel: str, payload: dict):
+        # never await here: one slow socket must not hold up the others
+        for sub in list(self.channels.get(channel, ())):
+            try:
+                sub.queue.put_nowait(payload)
+            except asyncio.QueueFull:
+                sub.overflowed.set()
+
+
+hub = ChatHub(make_broker(CHAT_BROKER_URL), CHAT_SUBSCRIBER_QUEUE_SIZE)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "relay":
+        asyncio.run(run_relay(sys.argv[2]))
+    else:
+        print("usage: python -m utils.chat_hub relay <socket path>")
@@ -0,0 +1,79 @@
+# utils/chat_read_state.py
+#
+# Per-member read cursors and unread counters for team chat.
+# chat_read_state holds one {user_id, team_id, unread, last_read} document
+# per participant; sending bumps everyone else's counter, so listing unread
+# counts never has to touch the messages. A participant without a document
+# yet is counted from the history once, on their first look.
+
+from datetime import datetime
+from pymongo import UpdateOne
+
+from database import chat_read_state_collection
+from utils.chat_store import chat_store
+
+
+def team_participants(team: dict) -> set:
+    """Creator, members and mentor of a team as str ids"""
+    ids = {
+        str(m.get("id") or m.get("_id")) if isinstance(m, dict) else str(m)
+        for m in team.get("members", [])
+    }
+    ids.update(str(team[f]) for f in ("creator_id", "mentor_id") if team.get(f))
+    return ids
+
+
+async def record_message(team: dict, sender_id: str):
+    """+1 unread for every participant except the sender that has a counter"""
+    team_id = str(team["_id"])
+    # no upsert: a fresh counter would start at 1 and hide the older history
+    ops = [
+        UpdateOne({"user_id": uid, "team_id": team_id}, {"$inc": {"unread": 1}})
+        for uid in team_participants(team) if uid != str(sender_id)
+    ]
+    if ops:
+        await chat_read_state_collection.bulk_write(ops, ordered=False)
+
+
+async def mark_read(team_id: str, user_id: str, position=None, cursor: str = None) -> int:
+    """Move the read cursor to `position` ((timestamp, _id), None = latest)"""
+    if position is None:
+        docs, _ = await chat_store.page(team_id, limit=1)
+        unread = 0
+        if docs:
+            position = (docs[-1]["timestamp"], docs[-1]["_id"])
+    else:
+        unread = await chat_store.count_after(team_id, position)
+
+    await chat_read_state_collection.update_one(
+        {"user_id": user_id, "team_id": team_id},
+        {"$set": {
+            "unread": unread,
+            "last_read": {"timestamp": position[0], "message_id": position[1], "cursor": cursor}
+            if position else None,
+            "read_at": datetime.utcnow(),
+        }},
+        upsert=True,
+    )
+    return unread
+
+
+async def unread_counts(user_id: str, team_ids) -> dict:
+    """team_id → unread for one user; teams never seen are counted once"""
+    counts = {}
+    async for state in chat_read_state_collection.find(
+        {"user_id": user_id, "team_id": {"$in": list(team_ids)}}, {"team_id": 1, "unread": 1}
+    ):
+        counts[state["team_id"]] = state.get("unread", 0)
+
+    for team_id in team_ids:
+        if team_id not in counts:
+            # first look at a team: everything so far is unread
+            unread = await chat_store.count_after(team_id)
+            await chat_read_state_collection.update_one(
+                {"user_id": user_id, "team_id": team_id},
+                {"$setOnInsert": {"unread": unread, "last_read": None}},
+                upsert=True,
+            )
+            counts[team_id] = unread
+    return counts
@@ -0,0 +1,278 @@
+# utils/chat_store.py
+#
+# Storage layouts for team chat, selected with CHAT_STORAGE:
+#
+#   messages – one chat_messages document per message (original layout)
+#   buckets  – chat_buckets documents holding up to CHAT_BUCKET_MAX_MESSAGES
+#              messages (and CHAT_BUCKET_MAX_BYTES of them) of one team inside
+#              one CHAT_BUCKET_WINDOW_HOURS window; a send is a single $push,
+#              a full bucket rolls over to a new one
+#
+# Both stores page by (timestamp, _id) positions, so cursors handed to
+# clients stay valid when switching layouts.
+#
+#   python -m utils.chat_store migrate   → copy chat_messages into buckets
+#                                          (run before CHAT_STORAGE=buckets)
+
+import asyncio
+import re
+import sys
+from datetime import datetime, timedelta
+
+import bson
+from bson import ObjectId
+from pymongo import InsertOne
+
+from config import CHAT_STORAGE, CHAT_BUCKET_WINDOW_HOURS, CHAT_BUCKET_MAX_MESSAGES, CHAT_BUCKET_MAX_BYTES
+from database import chat_messages_collection, chat_buckets_collection
+from utils.cursors import EPOCH, keyset_filter
+
+MIGRATION_BATCH = 500
+SEARCH_MAX_BUCKETS = 100
+WORD = re.compile(r"\w+")
+
+
+def _key(msg: dict):
+    return msg["timestamp"], msg["_id"]
+
+
+def _size(msg: dict) -> int:
+    return len(bson.encode(msg))
+
+
+def search_terms(query: str):
+    """Lower-cased words of a $text query, without negated terms"""
+    return {w.lower() for w in WORD.findall(re.sub(r"-\w+", " ", query))}
+
+
+# ---------------- Per-message layout ----------------
+class MessageStore:
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def append(self, team_id: str, message: dict) -> dict:
+        message.setdefault("_id", ObjectId())
+        await self.collection.insert_one({"team_id": team_id, **message})
+        return message
+
+    async def page(self, team_id: str, before=None, after=None, limit: int = 50):
+        """(messages oldest → newest, has_more) around a (timestamp, _id) position"""
+        query = {"team_id": team_id}
+        if before is not None:
+            query.update(keyset_filter("timestamp", before, "$lt"))
+        elif after is not None:
+            query.update(keyset_filter("timestamp", after, "$gt"))
+
+        order = 1 if after is not None else -1
+        docs = await self.collection.find(
+            query, {"team_id": 0}
+        ).sort([("timestamp", order), ("_id", order)]).limit(limit + 1).to_list(length=limit + 1)
+
+        has_more = len(docs) > limit
+        docs = docs[:limit]
+        if after is None:
+            docs.reverse()
+        return docs, has_more
+
+    async def count_after(self, team_id: str, after=None) -> int:
+        query = {"team_id": team_id}
+        if after is not None:
+            query.update(keyset_filter("timestamp", after, "$gt"))
+        return await self.collection.count_documents(query)
+
+    async def search(self, team_id: str, query: str, skip: int = 0, limit: int = 20):
+        """([(message, score)] best first, has_more) via the (team_id, text) index"""
+        docs = await self.collection.find(
+            {"team_id": team_id, "$text": {"$search": query}},
+            {"team_id": 0, "score": {"$meta": "textScore"}},
+        ).sort([("score", {"$meta": "textScore"}), ("timestamp", -1)]) \
+            .skip(skip).limit(limit + 1).to_list(length=limit + 1)
+
+        hits = [(doc, round(doc.pop("score"), 3)) for doc in docs]
+        return hits[:limit], len(hits) > limit
+
+
+# ---------------- Bucketed layout ----------------
+class BucketStore:
+    def __init__(self, collection, window_hours: int, max_messages: int,
+                 max_bytes: int = CHAT_BUCKET_MAX_BYTES):
+        self.collection = collection
+        self.window = timedelta(hours=window_hours)
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+
+    def window_start(self, ts: datetime) -> datetime:
+        return EPOCH + (ts - EPOCH) // self.window * self.window
+
+    async def append(self, team_id: str, message: dict) -> dict:
+        message.setdefault("_id", ObjectId())
+        ts = message["timestamp"]
+        size = _size(message)
+        # the count / size filters make a full bucket miss → upsert opens the next one
+        await self.collection.update_one(
+            {
+                "team_id": team_id,
+                "window": self.window_start(ts),
+                "count": {"$lt": self.max_messages},
+                "size": {"$lte": self.max_bytes - size},
+            },
+            {
+                "$push": {"messages": message},
+                "$inc": {"count": 1, "size": size},
+                "$min": {"start": ts},
+                "$max": {"end": ts},
+            },
+            upsert=True,
+        )
+        return message
+
+    async def page(self, team_id: str, before=None, after=None, limit: int = 50):
+        """(messages oldest → newest, has_more) around a (timestamp, _id) position.
+
+        Buckets are walked newest-end first (or oldest-start first going
+        forward), so once limit+1 candidates are held the walk stops at the
+        first bucket that cannot contain anything closer to the cursor.
+        """
+        forward = after is not None
+        query = {"team_id": team_id}
+        if forward:
+            query["end"] = {"$gte": after[0]}
+            sort = [("start", 1)]
+        else:
+            if before is not None:
+                query["start"] = {"$lte": before[0]}
+            sort = [("end", -1)]
+
+        candidates = []
+        cursor = self.collection.find(query, {"messages": 1, "start": 1, "end": 1}).sort(sort).batch_size(4)
+        async for bucket in cursor:
+            if len(candidates) > limit:
+                candidates.sort(key=_key, reverse=not forward)
+                del candidates[limit + 1:]
+                edge = candidates[limit]["timestamp"]
+                if (forward and bucket["start"] > edge) or (not forward and bucket["end"] < edge):
+                    break
+
+            for msg in bucket.get("messages", []):
+                if forward:
+                    if _key(msg) > after:
+                        candidates.append(msg)
+                elif before is None or _key(msg) < before:
+                    candidates.append(msg)
+
+        candidates.sort(key=_key, reverse=not forward)
+        has_more = len(candidates) > limit
+        docs = candidates[:limit]
+        if not forward:
+            docs.reverse()
+        return docs, has_more
+
+    async def count_after(self, team_id: str, after=None) -> int:
+        if after is None:
+            total = 0
+            async for bucket in self.collection.find({"team_id": team_id}, {"count": 1}):
+                total += bucket.get("count", 0)
+            return total
+
+        total = 0
+        cursor = self.collection.find(
+            {"team_id": team_id, "end": {"$gte": after[0]}},
+            {"messages.timestamp": 1, "messages._id": 1},
+        )
+        async for bucket in cursor:
+            total += sum(1 for msg in bucket.get("messages", []) if _key(msg) > after)
+        return total
+
+    async def search(self, team_id: str, query: str, skip: int = 0, limit: int = 20):
+        """([(message, score)] best first, has_more).
+
+        The text index finds the best-matching buckets of the team; messages
+        inside them are then ranked by how many query words they contain.
+        """
+        terms = search_terms(query)
+        if not terms:
+            return [], False
+
+        cursor = self.collection.find(
+            {"team_id": team_id, "$text": {"$search": query}},
+            {"messages": 1, "score": {"$meta": "textScore"}},
+        ).sort([("score", {"$meta": "textScore"})]).limit(SEARCH_MAX_BUCKETS)
+
+        hits = []
+        async for bucket in cursor:
+            for msg in bucket.get("messages", []):
+                words = [w.lower() for w in WORD.findall(msg.get("text", ""))]
+                # prefix match stands in for the index's stemming
+                matched = sum(any(w.startswith(t) for w in words) for t in terms)
+                if matched:
+                    hits.append((msg, round(matched / len(terms), 3)))
+
+        hits.sort(key=lambda h: (h[1], h[0]["timestamp"]), reverse=True)
+        return hits[skip:skip + limit], len(hits) > skip + limit
+
+
+def make_store(mode: str):
+    if mode == "buckets":
+        return BucketStore(chat_buckets_collection, CHAT_BUCKET_WINDOW_HOURS, CHAT_BUCKET_MAX_MESSAGES)
+    return MessageStore(chat_messages_collection)
+
+
+chat_store = make_store(CHAT_STORAGE)
+
+
+# ---------------- Migration ----------------
+async def migrate_to_buckets(source=chat_messages_collection, target: BucketStore = None):
+    """Pack existing per-message documents into buckets, team by team.
+
+    A team whose buckets already hold all of its messages is skipped; one
+    with fewer (a run interrupted mid-team) has its buckets rebuilt, so the
+    script can be re-run after an interruption. The source collection is
+    left untouched.
+    """
+    target = target or make_store("buckets")
+    migrated = skipped = 0
+
+    for team_id in await source.distinct("team_id"):
+        expected = await source.count_documents({"team_id": team_id, "timestamp": {"$type": "date"}})
+        if await target.count_after(team_id) >= expected:
+            skipped += 1
+            continue
+        await target.collection.delete_many({"team_id": team_id})
+
+        ops, bucket = [], None
+        cursor = source.find({"team_id": team_id}, {"team_id": 0}).sort([("timestamp", 1), ("_id", 1)])
+        async for msg in cursor:
+            if not isinstance(msg.get("timestamp"), datetime):
+                continue
+            window = target.window_start(msg["timestamp"])
+            size = _size(msg)
+            if (bucket is None or bucket["window"] != window or bucket["count"] >= target.max_messages
+                    or bucket["size"] + size > target.max_bytes):
+                if bucket:
+                    ops.append(InsertOne(bucket))
+                bucket = {"team_id": team_id, "window": window, "count": 0, "size": 0,
+                          "start": msg["timestamp"], "messages": []}
+            bucket["messages"].append(msg)
+            bucket["count"] += 1
+            bucket["size"] += size
+            bucket["end"] = msg["timestamp"]
+
+            if len(ops) >= MIGRATION_BATCH:
+                await target.collection.bulk_write(ops, ordered=False)
+                ops = []
+
+        if bucket:
+            ops.append(InsertOne(bucket))
+        if ops:
+            await target.collection.bulk_write(ops, ordered=False)
+        migrated += 1
+
+    print(f"Chat buckets: migrated {migrated} teams, skipped {skipped} already complete")
+    return migrated, skipped
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["migrate"]:
+        asyncio.run(migrate_to_buckets())
+    else:
+        print("usage: python -m utils.chat_store migrate")
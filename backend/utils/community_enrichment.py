@@ -0,0 +1,199 @@
+# utils/community_enrichment.py
+#
+# Background moderation / tagging / sentiment for community posts and
+# replies (community_replies). Writers only enqueue; a single worker
+# drains the queue in batches, asks the LLM about the whole batch in one
+# JSON request and writes the results back with one bulk_write.
+#
+# Anything not enriched (queue full, LLM down, unparsable answer) is picked
+# up again by the periodic sweep, up to MAX_ATTEMPTS times.
+
+import asyncio
+import json
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from config import (
+    COMMUNITY_ENRICH_BATCH_SIZE,
+    COMMUNITY_ENRICH_WAIT_SECONDS,
+    COMMUNITY_ENRICH_SWEEP_SECONDS,
+)
+from database import community_collection, community_replies_collection
+from utils.llm_gateway import generate
+from utils.feed_cache import public_feed
+
+QUEUE_SIZE = 1000
+MAX_TEXT_CHARS = 1000
+MAX_ATTEMPTS = 3
+SENTIMENTS = {"Positive", "Neutral", "Needs Improvement"}
+
+_queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+_queued = set()  # ids waiting in the queue or in the batch being enriched
+
+
+# ---------------- Producers ----------------
+def _enqueue(item: dict) -> bool:
+    if item["id"] in _queued:
+        return True
+    try:
+        _queue.put_nowait(item)
+    except asyncio.QueueFull:
+        return False  # the sweep will find it
+    _queued.add(item["id"])
+    return True
+
+
+def enqueue_post(post_id: ObjectId, text: str) -> bool:
+    return _enqueue({"kind": "post", "id": post_id, "text": text})
+
+
+def enqueue_reply(reply_id: ObjectId, text: str) -> bool:
+    return _enqueue({"kind": "reply", "id": reply_id, "text": text})
+
+
+# ---------------- Batch prompt ----------------
+def build_prompt(items) -> str:
+    listing = json.dumps(
+        [{"id": str(i), "text": item["text"][:MAX_TEXT_CHARS]} for i, item in enumerate(items)],
+        ensure_ascii=False,
+    )
+    return f"""
+You review posts of a student community. For EVERY item below return one
+result object. Respond ONLY with a JSON array, no prose, in this shape:
+
+[{{"id": "<id>", "safe": true|false, "tags": ["3-5 technical or professional tags"],
+  "summary": "<one sentence>", "sentiment": "Positive|Neutral|Needs Improvement"}}]
+
+"safe" is false for toxic, abusive, hateful or unsafe content.
+
+Items:
+{listing}
+"""
+
+
+def parse_results(text: str, count: int) -> dict:
+    """index → result for every well-formed entry of the model's JSON array"""
+    start, end = text.find("["), text.rfind("]")
+    if start == -1 or end <= start:
+        return {}
+    try:
+        entries = json.loads(text[start:end + 1])
+    except ValueError:
+        return {}
+
+    results = {}
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        try:
+            index = int(entry.get("id"))
+        except (TypeError, ValueError):
+            continue
+        if not 0 <= index < count:
+            continue
+        sentiment = str(entry.get("sentiment", "Neutral")).strip()
+        tags = entry.get("tags") or []
+        if isinstance(tags, str):
+            tags = tags.split(",")
+        results[index] = {
+            "safe": entry.get("safe") is not False,
+            "tags": [str(t).strip() for t in tags if str(t).strip()][:5],
+            "summary": str(entry.get("summary", "")).strip(),
+            "sentiment": sentiment if sentiment in SENTIMENTS else "Neutral",
+        }
+    return results
+
+
+def _write_op(item: dict, result) -> UpdateOne:
+    query = {"_id": item["id"]}
+    if result is None:
+        return UpdateOne(query, {"$inc": {"enrichment_attempts": 1}})
+
+    now = datetime.utcnow()
+    return UpdateOne(query, {"$set": {
+        "tags": result["tags"],
+        "moderation": {"safe": result["safe"], "checked_at": now},
+        "summary": result["summary"],
+        "sentiment": result["sentiment"],
+        "enriched_at": now,
+    }})
+
+
+async def enrich_batch(items):
+    try:
+        answer = await generate(build_prompt(items), route="community.enrich")
+        results = parse_results(answer, len(items))
+    except Exception as e:
+        print("Community enrichment failed:", e)
+        results = {}
+
+    ops = {"post": [], "reply": []}
+    for i, item in enumerate(items):
+        ops[item["kind"]].append(_write_op(item, results.get(i)))
+
+    if ops["post"]:
+        await community_collection.bulk_write(ops["post"], ordered=False)
+    if ops["reply"]:
+        await community_replies_collection.bulk_write(ops["reply"], ordered=False)
+    if results:
+        public_feed.invalidate()  # new tags / flags
+    return len(results)
+
+
+# ---------------- Worker ----------------
+async def _next_batch():
+    items = [await _queue.get()]
+    deadline = asyncio.get_running_loop().time() + COMMUNITY_ENRICH_WAIT_SECONDS
+    while len(items) < COMMUNITY_ENRICH_BATCH_SIZE:
+        remaining = deadline - asyncio.get_running_loop().time()
+        if remaining <= 0:
+            break
+        try:
+            items.append(await asyncio.wait_for(_queue.get(), remaining))
+        except asyncio.TimeoutError:
+            break
+    return items
+
+
+async def enrichment_worker():
+    """Started with the app; drains the queue one LLM call per batch"""
+    while True:
+        items = await _next_batch()
+        try:
+            await enrich_batch(items)
+        except Exception as e:
+            print("Community enrichment write failed:", e)
+        finally:
+            _queued.difference_update(item["id"] for item in items)
+
+
+async def sweep_unenriched() -> int:
+    """Queue every post / reply that has not been enriched yet"""
+    queued = 0
+    pending = {"enriched_at": {"$exists": False}, "enrichment_attempts": {"$not": {"$gte": MAX_ATTEMPTS}}}
+
+    for collection, enqueue in (
+        (community_collection, enqueue_post),
+        (community_replies_collection, enqueue_reply),
+    ):
+        async for doc in collection.find(pending, {"content": 1}):
+            if doc["_id"] in _queued:
+                continue  # still waiting for the worker
+            if not enqueue(doc["_id"], doc.get("content", "")):
+                return queued
+            queued += 1
+    return queued
+
+
+async def enrichment_sweeper():
+    """Backfill at startup, then catch whatever the queue dropped"""
+    while True:
+        try:
+            queued = await sweep_unenriched()
+            if queued:
+                print(f"Community enrichment: queued {queued} items")
+        except Exception as e:
+            print("Community enrichment sweep failed:", e)
+        await asyncio.sleep(COMMUNITY_ENRICH_SWEEP_SECONDS)
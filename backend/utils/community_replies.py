@@ -0,0 +1,105 @@
+# utils/community_replies.py
+#
+# Community replies live in community_replies ({post_id, ...}, indexed on
+# (post_id, created_at, _id)). The post only keeps reply_count and a short
+# recent_replies preview, so a busy thread never grows the post document.
+#
+#   python -m utils.community_replies migrate   → move embedded replies out
+
+import asyncio
+import sys
+
+from pymongo import UpdateOne
+
+from database import community_collection, community_replies_collection
+
+PREVIEW_SIZE = 3
+
+
+def reply_preview(reply: dict) -> dict:
+    return {
+        "_id": reply["_id"],
+        "author_name": reply.get("author_name", "Anonymous"),
+        "author_role": reply.get("author_role", "Student"),
+        "content": reply.get("content", ""),
+        "created_at": reply.get("created_at"),
+    }
+
+
+async def add_reply(post_id, reply: dict):
+    """Insert a reply and bump the post's counter / preview"""
+    # a post still carrying an embedded replies array (even an empty one) is
+    # moved over first, otherwise the new reply_count / recent_replies would
+    # hide the older replies
+    legacy = await community_collection.find_one(
+        {"_id": post_id, "replies": {"$exists": True}}, {"replies": 1}
+    )
+    if legacy:
+        await migrate_post(legacy)
+
+    await community_replies_collection.insert_one({"post_id": post_id, **reply})
+    # only once the embedded array is gone: migrate_post's $set of the
+    # counters applies only while it is there, so the two never overwrite
+    # each other
+    await community_collection.update_one(
+        {"_id": post_id, "replies": {"$exists": False}},
+        {
+            "$inc": {"reply_count": 1},
+            "$push": {"recent_replies": {"$each": [reply_preview(reply)], "$slice": -PREVIEW_SIZE}},
+        },
+    )
+
+
+# ---------------- Migration ----------------
+async def migrate_post(post: dict) -> int:
+    """Copy one post's embedded replies into community_replies and drop them.
+
+    Replies are upserted by _id, and the counters are only written while the
+    embedded array is still there (add_reply only counts once it is gone),
+    so running it twice or racing add_reply neither duplicates replies nor
+    loses or double counts them.
+    """
+    replies = [r for r in post.get("replies", []) if r.get("_id")]
+    if replies:
+        await community_replies_collection.bulk_write([
+            UpdateOne({"_id": r["_id"]}, {"$setOnInsert": {"post_id": post["_id"], **r}}, upsert=True)
+            for r in replies
+        ], ordered=False)
+
+    reply_count = await community_replies_collection.count_documents({"post_id": post["_id"]})
+    latest = await community_replies_collection.find(
+        {"post_id": post["_id"]}
+    ).sort([("created_at", -1), ("_id", -1)]).limit(PREVIEW_SIZE).to_list(PREVIEW_SIZE)
+
+    await community_collection.update_one(
+        {"_id": post["_id"], "replies": {"$exists": True}},
+        {
+            "$set": {
+                "reply_count": reply_count,
+                "recent_replies": [reply_preview(r) for r in reversed(latest)],
+            },
+            "$unset": {"replies": ""},
+        },
+    )
+    return len(replies)
+
+
+async def migrate_embedded_replies():
+    """Move every post's embedded replies out (resumable)"""
+    moved_posts = moved_replies = 0
+    cursor = community_collection.find(
+        {"replies": {"$exists": True}}, {"replies": 1}
+    )
+    async for post in cursor:
+        moved_replies += await migrate_post(post)
+        moved_posts += 1
+
+    print(f"Community replies: moved {moved_replies} replies out of {moved_posts} posts")
+    return moved_posts, moved_replies
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["migrate"]:
+        asyncio.run(migrate_embedded_replies())
+    else:
+        print("usage: python -m utils.community_replies migrate")
@@ -0,0 +1,33 @@
+# utils/cursors.py
+#
+# Opaque keyset cursors shared by the paginated endpoints (team chat,
+# community feed, replies). A cursor is "<epoch ms>_<ObjectId>", i.e. a
+# position on a (timestamp field, _id) index. Mongo keeps milliseconds, so
+# timestamps are truncated the same way here.
+
+from datetime import datetime, timedelta
+from bson import ObjectId
+from fastapi import HTTPException
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def encode_cursor(ts, doc_id):
+    if not isinstance(ts, datetime):
+        return None
+    return f"{(ts.replace(tzinfo=None) - EPOCH) // timedelta(milliseconds=1)}_{doc_id}"
+
+
+def decode_cursor(cursor: str):
+    """(timestamp, ObjectId) for a cursor; 400 when it is malformed"""
+    try:
+        ms, doc_id = cursor.split("_", 1)
+        return EPOCH + timedelta(milliseconds=int(ms)), ObjectId(doc_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_filter(field: str, position, op: str) -> dict:
+    """Documents strictly before ("$lt") or after ("$gt") a (ts, _id) position"""
+    ts, doc_id = position
+    return {"$or": [{field: {op: ts}}, {field: ts, "_id": {op: doc_id}}]}
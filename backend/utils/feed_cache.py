@@ -0,0 +1,57 @@
+# utils/feed_cache.py
+#
+# Shared, pre-serialized copy of a public response (the community
+# /posts feed). Every viewer gets the same bytes and ETag; writers call
+# invalidate() to bump the version, and a short TTL bounds staleness for
+# writes that landed on another worker.
+
+import asyncio
+import hashlib
+import json
+import time
+
+from fastapi.encoders import jsonable_encoder
+
+from config import COMMUNITY_FEED_CACHE_SECONDS
+
+
+class SharedResponseCache:
+    def __init__(self, ttl_seconds: float):
+        self.ttl = ttl_seconds
+        self.version = 0
+        self.entry = None  # (version, built_at, body, etag)
+        self.lock = asyncio.Lock()
+
+    def invalidate(self):
+        self.version += 1
+
+    def _fresh(self):
+        entry = self.entry
+        if entry and entry[0] == self.version and time.monotonic() - entry[1] < self.ttl:
+            return entry
+        return None
+
+    async def get(self, build):
+        """(body bytes, etag) – `build` is awaited at most once per refresh"""
+        entry = self._fresh()
+        if entry is None:
+            async with self.lock:
+                entry = self._fresh()
+                if entry is None:
+                    version = self.version
+                    data = await build()
+                    body = json.dumps(jsonable_encoder(data), ensure_ascii=False, separators=(",", ":")).encode()
+                    etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+                    entry = self.entry = (version, time.monotonic(), body, etag)
+        return entry[2], entry[3]
+
+
+# GET /api/community/posts
+public_feed = SharedResponseCache(COMMUNITY_FEED_CACHE_SECONDS)
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
@@ -0,0 +1,112 @@
+# utils/grade_analytics.py
+
+import math
+import time
+import warnings
+
+import numpy as np
+
+from database import submissions_collection
+
+PERCENTILES = [10, 25, 50, 75, 90]
+HISTOGRAM_BINS = 10
+CACHE_TTL_SECONDS = 10 * 60
+
+# mentor_id → (computed_at, result); dropped whenever that mentor grades
+_cohort_cache = {}
+
+
+def invalidate_cohort_analytics(mentor_id: str = None):
+    if mentor_id is None:
+        _cohort_cache.clear()
+    else:
+        _cohort_cache.pop(str(mentor_id), None)
+
+
+def _num(value):
+    """numpy scalar → JSON-safe float (NaN → None)"""
+    value = float(value)
+    return None if math.isnan(value) else round(value, 2)
+
+
+async def _load_grades(team_ids, criteria):
+    """Latest graded submission per team as (team_ids, scores, criteria matrix)"""
+    latest = {}
+    cursor = submissions_collection.find(
+        {"team_id": {"$in": team_ids}, "final_score": {"$ne": None}},
+        {"team_id": 1, "version": 1, "final_score": 1, "rubric": 1, "_id": 0}
+    ).sort("version", 1)
+    async for s in cursor:
+        latest[s["team_id"]] = s  # ascending versions → last one wins
+
+    ids = list(latest)
+    scores = np.fromiter(
+        (float(latest[t]["final_score"]) for t in ids), dtype=float, count=len(ids)
+    )
+    matrix = np.array(
+        [[float((latest[t].get("rubric") or {}).get(c, np.nan)) for c in criteria] for t in ids],
+        dtype=float
+    ).reshape(len(ids), len(criteria))
+    return ids, scores, matrix
+
+
+def summarize(ids, scores, matrix, criteria) -> dict:
+    """Distribution, percentiles, per-criterion means and IQR outliers"""
+    if scores.size == 0:
+        return {"graded_teams": 0}
+
+    q1, q3 = np.percentile(scores, [25, 75])
+    iqr = q3 - q1
+    low, high = q1 - 1.5 * iqr, q3 + 1.5 * iqr
+    std = scores.std()
+    z = (scores - scores.mean()) / std if std > 0 else np.zeros_like(scores)
+    outlier_idx = np.flatnonzero((scores < low) | (scores > high))
+
+    counts, edges = np.histogram(scores, bins=HISTOGRAM_BINS)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # criterion never graded → NaN
+        means = np.nanmean(matrix, axis=0) if matrix.size else np.full(len(criteria), np.nan)
+        stds = np.nanstd(matrix, axis=0) if matrix.size else np.full(len(criteria), np.nan)
+
+    return {
+        "graded_teams": int(scores.size),
+        "score": {
+            "mean": _num(scores.mean()),
+            "std": _num(std),
+            "min": _num(scores.min()),
+            "max": _num(scores.max()),
+            "percentiles": {
+                f"p{p}": _num(v) for p, v in zip(PERCENTILES, np.percentile(scores, PERCENTILES))
+            },
+        },
+        "histogram": [
+            {"from": _num(edges[i]), "to": _num(edges[i + 1]), "count": int(counts[i])}
+            for i in range(len(counts))
+        ],
+        "criteria": {
+            c: {"mean": _num(means[i]), "std": _num(stds[i])} for i, c in enumerate(criteria)
+        },
+        "outliers": [
+            {
+                "team_id": ids[i],
+                "final_score": _num(scores[i]),
+                "z_score": _num(z[i]),
+                "direction": "high" if scores[i] > high else "low",
+            }
+            for i in outlier_idx
+        ],
+    }
+
+
+async def cohort_analytics(mentor_id: str, team_ids, criteria) -> dict:
+    """Cached per mentor; invalidated on grading, expires after CACHE_TTL_SECONDS"""
+    mentor_id = str(mentor_id)
+    cached = _cohort_cache.get(mentor_id)
+    if cached and time.monotonic() - cached[0] < CACHE_TTL_SECONDS:
+        return cached[1]
+
+    ids, scores, matrix = await _load_grades(team_ids, criteria)
+    result = {"total_teams": len(team_ids), **summarize(ids, scores, matrix, criteria)}
+    _cohort_cache[mentor_id] = (time.monotonic(), result)
+    return result
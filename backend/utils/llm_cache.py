@@ -0,0 +1,89 @@
+# utils/llm_cache.py
+#
+# Prompt → response cache used by utils/llm_gateway.py. Keys are a hash of
+# the model name and the whitespace-normalised prompt; entries live in a
+# small in-process LRU and in the llm_cache collection (TTL-indexed on
+# expires_at) so they survive restarts and are shared between workers.
+#
+# How long an answer stays usable is decided per route in FRESHNESS;
+# routes not listed there are never cached.
+
+import hashlib
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from config import LLM_CACHE_MEMORY_ITEMS
+from database import llm_cache_collection
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+
+# route → max age in seconds
+FRESHNESS = {
+    "community.reply": 7 * DAY,
+    "career.insights": DAY,
+}
+
+_memory = OrderedDict()  # key → (stored_at monotonic, text)
+
+
+def max_age(route: str) -> int:
+    return FRESHNESS.get(route, 0)
+
+
+def cache_key(model: str, prompt: str) -> str:
+    normalized = re.sub(r"\s+", " ", prompt).strip()
+    return hashlib.sha256(f"{model}\0{normalized}".encode()).hexdigest()
+
+
+def _remember(key: str, text: str, stored_at: float):
+    if LLM_CACHE_MEMORY_ITEMS <= 0:
+        return
+    _memory[key] = (stored_at, text)
+    _memory.move_to_end(key)
+    while len(_memory) > LLM_CACHE_MEMORY_ITEMS:
+        _memory.popitem(last=False)
+
+
+async def lookup(key: str, age_limit: int):
+    """(text, "memory" | "db") for a fresh entry, (None, None) otherwise"""
+    entry = _memory.get(key)
+    if entry:
+        if time.monotonic() - entry[0] <= age_limit:
+            _memory.move_to_end(key)
+            return entry[1], "memory"
+        _memory.pop(key, None)
+
+    try:
+        doc = await llm_cache_collection.find_one({"_id": key}, {"text": 1, "created_at": 1})
+    except Exception as e:
+        print("LLM cache read failed:", e)
+        return None, None
+
+    if doc:
+        age = (datetime.utcnow() - doc["created_at"]).total_seconds()
+        if age <= age_limit:
+            _remember(key, doc["text"], time.monotonic() - age)
+            return doc["text"], "db"
+    return None, None
+
+
+async def store(key: str, route: str, model: str, text: str, age_limit: int):
+    _remember(key, text, time.monotonic())
+    now = datetime.utcnow()
+    try:
+        await llm_cache_collection.replace_one(
+            {"_id": key},
+            {
+                "route": route,
+                "model": model,
+                "text": text,
+                "created_at": now,
+                "expires_at": now + timedelta(seconds=age_limit),
+            },
+            upsert=True,
+        )
+    except Exception as e:
+        print("LLM cache write failed:", e)
@@ -0,0 +1,237 @@
+# utils/llm_gateway.py
+#
+# Single entry point for LLM calls from route handlers:
+#
+#   text = await generate("prompt", route="community.reply")
+#
+# Calls never block the event loop (Gemini's async client), are capped by a
+# process-wide semaphore, time out after LLM_TIMEOUT_SECONDS, and retry
+# transient failures with exponential backoff + full jitter. Per-route
+# latency / token / error counters are kept in memory (metrics_snapshot()).
+#
+# Answers for routes with a freshness policy are served from the prompt
+# cache (utils/llm_cache.py); identical prompts already in flight share
+# one backend call.
+#
+# LLM_BACKEND=stub swaps Gemini for the offline stand-in in
+# utils/llm_stub.py, so the AI routes can be load-tested without network
+# access or API quota (scripts/ai_load_test.py).
+
+import asyncio
+import random
+import time
+from collections import deque
+
+from config import (
+    GEMINI_API_KEY,
+    LLM_BACKEND,
+    LLM_MODEL,
+    LLM_TIMEOUT_SECONDS,
+    LLM_MAX_CONCURRENCY,
+    LLM_MAX_RETRIES,
+)
+from utils import llm_cache
+
+RETRY_BASE_SECONDS = 0.5
+RETRY_MAX_SECONDS = 8
+LATENCY_WINDOW = 500
+
+
+class LLMError(Exception):
+    """Raised when a call still fails after all retries"""
+
+
+# ---------------- Backends ----------------
+class GeminiBackend:
+    name = "gemini"
+
+    def __init__(self, model_name: str):
+        import google.generativeai as genai
+
+        genai.configure(api_key=GEMINI_API_KEY)
+        self.model_name = model_name
+        self.model = genai.GenerativeModel(model_name)
+
+    async def generate(self, prompt: str, timeout: float, route: str = "default") -> dict:
+        response = await self.model.generate_content_async(
+            prompt, request_options={"timeout": timeout}
+        )
+        usage = getattr(response, "usage_metadata", None)
+        return {
+            "text": response.text,
+            "prompt_tokens": getattr(usage, "prompt_token_count", 0) or 0,
+            "output_tokens": getattr(usage, "candidates_token_count", 0) or 0,
+        }
+
+    @staticmethod
+    def is_transient(error: Exception) -> bool:
+        try:
+            from google.api_core import exceptions as gexc
+        except ImportError:
+            return False
+        return isinstance(error, (
+            gexc.ResourceExhausted,
+            gexc.ServiceUnavailable,
+            gexc.DeadlineExceeded,
+            gexc.InternalServerError,
+        ))
+
+
+def make_backend(name: str):
+    if name == "stub":
+        from utils.llm_stub import StubBackend
+        return StubBackend()
+    return GeminiBackend(LLM_MODEL)
+
+
+backend = make_backend(LLM_BACKEND)
+_semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+_in_flight = 0
+_pending = {}  # cache key → Future shared by identical concurrent prompts
+
+
+# ---------------- Metrics ----------------
+class RouteMetrics:
+    def __init__(self):
+        self.requests = 0
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.coalesced = 0
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.retries = 0
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def snapshot(self) -> dict:
+        ordered = sorted(self.latencies)
+
+        def pct(p):
+            return round(ordered[min(int(len(ordered) * p), len(ordered) - 1)] * 1000, 1) if ordered else None
+
+        hits = self.memory_hits + self.db_hits + self.coalesced
+        return {
+            "requests": self.requests,
+            "cache": {
+                "memory_hits": self.memory_hits,
+                "db_hits": self.db_hits,
+                "coalesced": self.coalesced,
+                "hit_rate": round(hits / self.requests, 3) if self.requests else None,
+            },
+            "calls": self.calls,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "retries": self.retries,
+            "prompt_tokens": self.prompt_tokens,
+            "output_tokens": self.output_tokens,
+            "latency_ms": {"p50": pct(0.5), "p95": pct(0.95), "p99": pct(0.99)},
+        }
+
+
+_metrics = {}
+
+
+def _route_metrics(route: str) -> RouteMetrics:
+    if route not in _metrics:
+        _metrics[route] = RouteMetrics()
+    return _metrics[route]
+
+
+def metrics_snapshot() -> dict:
+    return {
+        "backend": backend.name,
+        "model": backend.model_name,
+        "in_flight": _in_flight,
+        "max_concurrency": LLM_MAX_CONCURRENCY,
+        "routes": {route: m.snapshot() for route, m in sorted(_metrics.items())},
+    }
+
+
+# ---------------- Gateway ----------------
+async def _call_backend(prompt: str, route: str, timeout: float, retries: int,
+                        metrics: RouteMetrics) -> str:
+    global _in_flight
+    metrics.calls += 1
+
+    for attempt in range(retries + 1):
+        start = time.perf_counter()
+        try:
+            async with _semaphore:
+                _in_flight += 1
+                try:
+                    result = await asyncio.wait_for(backend.generate(prompt, timeout, route), timeout)
+                finally:
+                    _in_flight -= 1
+        except asyncio.TimeoutError as e:
+            metrics.timeouts += 1
+            error, transient = e, True
+        except Exception as e:
+            error, transient = e, backend.is_transient(e)
+        else:
+            metrics.latencies.append(time.perf_counter() - start)
+            metrics.prompt_tokens += result["prompt_tokens"]
+            metrics.output_tokens += result["output_tokens"]
+            return result["text"]
+
+        if not transient or attempt == retries:
+            metrics.errors += 1
+            raise LLMError(f"{route}: {error!r}") from error
+
+        metrics.retries += 1
+        # full jitter keeps retries from many requests from lining up
+        await asyncio.sleep(random.uniform(0, min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** attempt)))
+
+
+async def generate(prompt: str, route: str = "default", timeout: float = None,
+                   retries: int = LLM_MAX_RETRIES, use_cache: bool = True) -> str:
+    """Generated text for `prompt`; raises LLMError once retries are exhausted.
+
+    use_cache=False skips the cache lookup (the fresh answer is still stored).
+    """
+    timeout = timeout or LLM_TIMEOUT_SECONDS
+    metrics = _route_metrics(route)
+    metrics.requests += 1
+
+    age_limit = llm_cache.max_age(route)
+    if not age_limit:
+        return await _call_backend(prompt, route, timeout, retries, metrics)
+
+    key = llm_cache.cache_key(backend.model_name, prompt)
+    if use_cache:
+        text, source = await llm_cache.lookup(key, age_limit)
+        if text is not None:
+            if source == "memory":
+                metrics.memory_hits += 1
+            else:
+                metrics.db_hits += 1
+            return text
+
+        if key in _pending:
+            metrics.coalesced += 1
+            shared = _pending[key]
+            try:
+                return await asyncio.shield(shared)
+            except asyncio.CancelledError:
+                if shared.cancelled() and not asyncio.current_task().cancelling():
+                    raise LLMError(f"{route}: shared call was cancelled")
+                raise
+
+    future = asyncio.get_running_loop().create_future()
+    _pending[key] = future
+    try:
+        text = await _call_backend(prompt, route, timeout, retries, metrics)
+        await llm_cache.store(key, route, backend.model_name, text, age_limit)
+        future.set_result(text)
+        return text
+    except Exception as e:
+        future.set_exception(e)
+        future.exception()  # waiters re-raise it; don't warn when there are none
+        raise
+    finally:
+        # leader cancelled (client gone, timeout, shutdown) → release waiters too
+        if not future.done():
+            future.cancel()
+        if _pending.get(key) is future:
+            del _pending[key]
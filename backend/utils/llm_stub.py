@@ -0,0 +1,139 @@
+# utils/llm_stub.py
+#
+# Offline stand-in for Gemini (LLM_BACKEND=stub). Answers are canned but
+# shaped exactly like each route expects, so the route's parsing code runs
+# for real; the same prompt always gets the same answer. Latency is drawn
+# from a configurable distribution with a fixed seed:
+#
+#   LLM_STUB_LATENCY=fixed:300            always 300 ms
+#   LLM_STUB_LATENCY=uniform:100,800      uniform between 100 and 800 ms
+#   LLM_STUB_LATENCY=lognormal:300,0.5    median 300 ms, long right tail
+#
+# LLM_STUB_ERROR_RATE makes that share of calls fail with a retryable error.
+
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+
+from config import LLM_STUB_LATENCY, LLM_STUB_ERROR_RATE, LLM_STUB_SEED
+
+TAGS = ["Python", "React", "Machine Learning", "Teamwork", "APIs", "Databases", "Career", "DSA"]
+SENTIMENTS = ["Positive", "Neutral", "Needs Improvement"]
+
+
+class StubTransientError(Exception):
+    """Injected failure, treated like a Gemini 503"""
+
+
+def parse_latency(spec: str):
+    """'kind:a,b' → zero-arg function returning seconds"""
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v.strip()]
+    rng = random.Random(LLM_STUB_SEED)
+
+    if kind == "fixed":
+        return lambda: values[0] / 1000
+    if kind == "uniform":
+        return lambda: rng.uniform(values[0], values[1]) / 1000
+    if kind == "lognormal":
+        median, sigma = values[0], values[1] if len(values) > 1 else 0.5
+        return lambda: rng.lognormvariate(math.log(median), sigma) / 1000
+    raise ValueError(f"Unknown LLM_STUB_LATENCY distribution: {spec}")
+
+
+# ---------------- Canned answers ----------------
+def _pick(seed: int, options, k: int = 1):
+    return [options[(seed + i * 7) % len(options)] for i in range(k)]
+
+
+def _enrich(prompt: str, seed: int) -> str:
+    try:
+        items = json.loads(prompt[prompt.rindex("Items:") + len("Items:"):].strip())
+    except ValueError:
+        items = []
+    return json.dumps([
+        {
+            "id": item.get("id"),
+            "safe": True,
+            "tags": _pick(seed + i, TAGS, 3),
+            "summary": "The author shares an update and asks the community for input.",
+            "sentiment": _pick(seed + i, SENTIMENTS)[0],
+        }
+        for i, item in enumerate(items)
+    ])
+
+
+def _career(prompt: str, seed: int) -> str:
+    name = re.search(r"- Name: (.*)", prompt)
+    name = name.group(1).strip() if name else "Learner"
+    strengths = _pick(seed, ["Problem solving", "Consistent learning", "Team collaboration",
+                             "Clean code habits", "Curiosity"], 3)
+    improve = _pick(seed + 1, ["System design", "Public speaking", "Open-source contributions",
+                               "Testing discipline", "Portfolio projects"], 3)
+    return (
+        f"---\n👋 Hi {name}!\n\n"
+        f"💼 **Career Readiness Score:** {60 + seed % 41}%\n\n"
+        "1️⃣ **Top 3 Strengths:**\n" + "".join(f"• {s}\n" for s in strengths) + "\n"
+        "2️⃣ **Top 3 Areas to Improve:**\n" + "".join(f"• {a}\n" for a in improve) + "\n"
+        '💬 **Motivational Quote:**\n"Small steps every day build big careers."\n---'
+    )
+
+
+def _story(prompt: str, seed: int) -> str:
+    role = re.search(r"Role: (.*)", prompt)
+    role = role.group(1).strip() if role else "engineer"
+    return (
+        "STORY:\n"
+        f"A year from now you open your laptop as a {role}. The struggles you had "
+        "turned into the stories you now tell new teammates.\n\n"
+        "STEPS:\n"
+        "- Pick one project that matches the role\n"
+        "- Ship a small part of it every week\n"
+        "- Ask a mentor for review every month\n"
+        "- Write down what you learned\n"
+        "- Apply to three roles each week\n\n"
+        "MOTIVATION:\n"
+        "You are closer than you think."
+    )
+
+
+CANNED = {
+    "community.reply": lambda prompt, seed: (
+        "Great question! I ran into the same thing last semester and breaking it "
+        "into smaller steps helped a lot. Happy to share what worked for me."
+    ),
+    "community.enrich": _enrich,
+    "career.insights": _career,
+    "future_story.generate": _story,
+}
+
+
+class StubBackend:
+    name = "stub"
+
+    def __init__(self, latency_spec: str = LLM_STUB_LATENCY, error_rate: float = LLM_STUB_ERROR_RATE):
+        self.model_name = "stub"
+        self.latency = parse_latency(latency_spec)
+        self.error_rate = error_rate
+        self.rng = random.Random(LLM_STUB_SEED)
+
+    async def generate(self, prompt: str, timeout: float, route: str = "default") -> dict:
+        await asyncio.sleep(self.latency())
+        if self.error_rate and self.rng.random() < self.error_rate:
+            raise StubTransientError("injected stub failure")
+
+        seed = int(hashlib.sha256(prompt.encode()).hexdigest()[:8], 16)
+        answer = CANNED.get(route)
+        text = answer(prompt, seed) if answer else f"Stub response {seed:08x} for offline testing."
+        return {
+            "text": text,
+            "prompt_tokens": len(prompt.split()),
+            "output_tokens": len(text.split()),
+        }
+
+    @staticmethod
+    def is_transient(error: Exception) -> bool:
+        return isinstance(error, StubTransientError)
@@ -0,0 +1,62 @@
+# utils/loaders.py
+#
+# DataLoader-style batching for user lookups. Every load() issued in the
+# same event-loop tick is collected into one `$in` query, and each id is
+# fetched at most once per loader. Create one loader per request
+# (Depends(user_loader)) so the cache never outlives the request.
+
+import asyncio
+from bson import ObjectId
+from database import users_collection
+
+USER_PUBLIC_FIELDS = {"full_name": 1, "name": 1, "email": 1, "role": 1, "skills": 1}
+
+
+class UserLoader:
+    def __init__(self, projection: dict = None):
+        self.projection = projection or USER_PUBLIC_FIELDS
+        self._cache = {}    # str id → Future[user | None]
+        self._queue = []
+        self._scheduled = False
+
+    async def load(self, user_id):
+        """User document for an id (str or ObjectId), None if missing/invalid"""
+        key = str(user_id)
+        future = self._cache.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._cache[key] = loop.create_future()
+            self._queue.append(key)
+            if not self._scheduled:
+                self._scheduled = True
+                loop.call_soon(self._dispatch)
+        return await future
+
+    async def load_many(self, user_ids) -> list:
+        """Same order as user_ids, None where no user matched"""
+        return await asyncio.gather(*(self.load(uid) for uid in user_ids))
+
+    def _dispatch(self):
+        keys, self._queue, self._scheduled = self._queue, [], False
+        asyncio.ensure_future(self._fetch(keys))
+
+    async def _fetch(self, keys):
+        try:
+            oids = [ObjectId(k) for k in keys if ObjectId.is_valid(k)]
+            users = {}
+            if oids:
+                async for user in users_collection.find({"_id": {"$in": oids}}, self.projection):
+                    users[str(user["_id"])] = user
+            for key in keys:
+                self._cache[key].set_result(users.get(key))
+        except Exception as e:
+            for key in keys:
+                if not self._cache[key].done():
+                    self._cache[key].set_exception(e)
+                # let a later load() retry instead of replaying the error
+                self._cache.pop(key, None)
+
+
+def user_loader() -> UserLoader:
+    """FastAPI dependency: a fresh loader per request"""
+    return UserLoader()
@@ -0,0 +1,79 @@
+# utils/notifications.py
+#
+# Fan-out-on-write inbox. Whoever causes an event (reply, like,
+# announcement, review) writes one notification per recipient, so reading
+# an inbox is a single bounded query on (user_id, created_at, _id).
+# Repeatable events (likes) go through notify_once(), keyed on dedupe_key.
+
+from datetime import datetime
+from pymongo.errors import DuplicateKeyError
+from database import notifications_collection, teams_collection
+
+
+def _notification(uid: str, kind: str, message: str, actor: dict, ref: dict, now) -> dict:
+    return {
+        "user_id": uid,
+        "type": kind,
+        "message": message,
+        "actor_id": str(actor["_id"]) if actor else None,
+        "actor_name": (actor.get("full_name") or actor.get("name")) if actor else None,
+        "ref": ref or {},
+        "read": False,
+        "created_at": now,
+    }
+
+
+async def notify(user_ids, kind: str, message: str, actor: dict = None, ref: dict = None):
+    """Insert one unread notification per recipient (never the actor)"""
+    actor_id = str(actor["_id"]) if actor else None
+    recipients = {str(u) for u in user_ids if u} - {actor_id}
+    if not recipients:
+        return
+
+    now = datetime.utcnow()
+    docs = [_notification(uid, kind, message, actor, ref, now) for uid in recipients]
+    try:
+        await notifications_collection.insert_many(docs, ordered=False)
+    except Exception as e:
+        # a lost notification must never fail the action that caused it
+        print("Notification fan-out failed:", e)
+
+
+async def notify_once(user_id, kind: str, message: str, actor: dict, ref: dict):
+    """Like notify() for one recipient, but only the first time this actor
+    does `kind` on `ref` (un-like / re-like doesn't notify again)"""
+    actor_id = str(actor["_id"])
+    if not user_id or str(user_id) == actor_id:
+        return
+
+    ref = ref or {}
+    dedupe_key = ":".join([kind, actor_id] + [f"{k}={ref[k]}" for k in sorted(ref)])
+    doc = _notification(str(user_id), kind, message, actor, ref, datetime.utcnow())
+    try:
+        await notifications_collection.update_one(
+            {"dedupe_key": dedupe_key}, {"$setOnInsert": doc}, upsert=True
+        )
+    except DuplicateKeyError:
+        pass  # a concurrent request already sent it
+    except Exception as e:
+        print("Notification failed:", e)
+
+
+async def mentee_ids(mentor_id: str) -> set:
+    """Members of every team mentored by mentor_id"""
+    ids = set()
+    async for team in teams_collection.find({"mentor_id": mentor_id}, {"members.id": 1}):
+        ids.update(m["id"] for m in team.get("members", []) if m.get("id"))
+    return ids
+
+
+def serialize_notification(n: dict) -> dict:
+    return {
+        "id": str(n["_id"]),
+        "type": n.get("type"),
+        "message": n.get("message", ""),
+        "actor_name": n.get("actor_name"),
+        "ref": n.get("ref", {}),
+        "read": n.get("read", False),
+        "created_at": n.get("created_at"),
+    }
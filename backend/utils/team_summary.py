@@ -0,0 +1,127 @@
+# utils/team_summary.py
+#
+# Teams carry compact copies of their latest submission and plagiarism
+# report ("latest_submission" / "latest_plagiarism") so team views, mentor
+# views and dashboards read one team document instead of sorting the child
+# collections. Every writer of submissions / rubrics / plagiarism reports
+# updates the summary through the helpers below.
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from database import teams_collection, submissions_collection, plagiarism_collection
+
+
+def submission_summary(submission: dict) -> dict:
+    return {
+        "id": str(submission["_id"]),
+        "version": submission.get("version"),
+        "status": submission.get("status"),
+        "final_score": submission.get("final_score"),
+        "rubric": submission.get("rubric"),
+        "mentor_feedback": submission.get("mentor_feedback"),
+        "submitted_at": submission.get("submitted_at"),
+        "graded_at": submission.get("graded_at"),
+    }
+
+
+def plagiarism_summary(report: dict) -> dict:
+    return {
+        "score": report.get("score"),
+        "status": report.get("status"),
+        "checked_at": report.get("checked_at"),
+    }
+
+
+async def record_grade(team_id: str, version: int, rubric: dict, final_score, graded_at):
+    """Mirror a rubric grade onto the team, unless a newer version is the latest"""
+    await teams_collection.update_one(
+        {"_id": ObjectId(team_id), "latest_submission.version": version},
+        {"$set": {
+            "latest_submission.rubric": rubric,
+            "latest_submission.final_score": final_score,
+            "latest_submission.graded_at": graded_at,
+        }}
+    )
+
+
+async def record_plagiarism(team_id: str, report):
+    """Mirror a plagiarism report onto the team (None clears it)"""
+    await teams_collection.update_one(
+        {"_id": ObjectId(team_id)},
+        {"$set": {"latest_plagiarism": plagiarism_summary(report) if report else None}}
+    )
+
+
+async def team_summaries(team: dict):
+    """(latest_submission, latest_plagiarism) for a team document.
+
+    Teams written before the summaries existed are filled in from the child
+    collections once and then served from the team document.
+    """
+    team_id = str(team["_id"])
+
+    if "latest_submission" in team:
+        submission = team["latest_submission"]
+    else:
+        latest = await submissions_collection.find_one({"team_id": team_id}, sort=[("version", -1)])
+        submission = submission_summary(latest) if latest else None
+        await _backfill(team["_id"], "latest_submission", submission)
+
+    if "latest_plagiarism" in team:
+        plagiarism = team["latest_plagiarism"]
+    else:
+        latest = await plagiarism_collection.find_one({"team_id": team_id}, sort=[("checked_at", -1)])
+        plagiarism = plagiarism_summary(latest) if latest else None
+        await _backfill(team["_id"], "latest_plagiarism", plagiarism)
+
+    return submission, plagiarism
+
+
+async def team_summaries_many(teams) -> dict:
+    """str team id → (latest_submission, latest_plagiarism) for many teams.
+
+    Same as team_summaries, but old teams are filled in with one aggregate
+    per child collection and one bulk write instead of queries per team.
+    """
+    found = {"latest_submission": {}, "latest_plagiarism": {}}
+    sources = (
+        ("latest_submission", submissions_collection, "version", submission_summary),
+        ("latest_plagiarism", plagiarism_collection, "checked_at", plagiarism_summary),
+    )
+    for field, collection, order, summarise in sources:
+        missing = [str(t["_id"]) for t in teams if field not in t]
+        if not missing:
+            continue
+        async for row in collection.aggregate([
+            {"$match": {"team_id": {"$in": missing}}},
+            {"$sort": {order: -1}},
+            {"$group": {"_id": "$team_id", "doc": {"$first": "$$ROOT"}}},
+        ]):
+            found[field][row["_id"]] = summarise(row["doc"])
+
+    summaries, backfill = {}, []
+    for t in teams:
+        team_id = str(t["_id"])
+        values = []
+        for field in ("latest_submission", "latest_plagiarism"):
+            if field in t:
+                values.append(t[field])
+            else:
+                value = found[field].get(team_id)
+                values.append(value)
+                backfill.append(UpdateOne(
+                    {"_id": t["_id"], field: {"$exists": False}}, {"$set": {field: value}}
+                ))
+        summaries[team_id] = tuple(values)
+
+    if backfill:
+        await teams_collection.bulk_write(backfill, ordered=False)
+    return summaries
+
+
+async def _backfill(team_oid, field: str, value):
+    # never overwrite a summary a concurrent writer just set
+    await teams_collection.update_one(
+        {"_id": team_oid, field: {"$exists": False}},
+        {"$set": {field: value}}
+    )
@@ -0,0 +1,207 @@
+# utils/upload_gc.py
+#
+# Reconciles files under uploads/ against the team_files collection and
+# reclaims the ones nothing points at (e.g. a crash between writing the
+# file and inserting its record in upload_team_file).
+#
+#   python -m utils.upload_gc           → dry-run report
+#   python -m utils.upload_gc --apply   → actually delete
+
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+from datetime import datetime, timedelta
+
+from config import (
+    UPLOAD_GC_INTERVAL_SECONDS,
+    UPLOAD_GC_GRACE_SECONDS,
+    UPLOAD_GC_MAX_DELETES_PER_SECOND,
+)
+from database import blobs_collection, file_texts_collection, team_files_collection
+from utils.blob_store import UPLOAD_DIR, BLOB_DIR, VARIANT_SUFFIXES, path_to_url, remove_quietly
+
+BATCH_SIZE = 200
+BATCH_PAUSE_SECONDS = 0.05
+REPORT_LIMIT = 500
+
+BLOB_FILE = re.compile(r"^(?P<sha>[0-9a-f]{64})(\.[\w-]+)?$")
+
+
+class RateLimiter:
+    """Spaces calls out to at most `rate` per second"""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate if rate > 0 else 0
+        self.next_at = 0.0
+
+    async def wait(self):
+        now = time.monotonic()
+        if self.next_at > now:
+            await asyncio.sleep(self.next_at - now)
+        self.next_at = max(now, self.next_at) + self.interval
+
+
+# ---------------- Scanning ----------------
+def _walk(root: str):
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    st = entry.stat(follow_symlinks=False)
+                    yield entry.path, st.st_size, st.st_mtime
+
+
+def _next_batch(walker, size: int):
+    batch = []
+    for item in walker:
+        batch.append(item)
+        if len(batch) >= size:
+            break
+    return batch
+
+
+def _split_variant(path: str):
+    """('x.txt', 'gzip') for 'x.txt.gz', (path, None) for everything else"""
+    for encoding, suffix in VARIANT_SUFFIXES.items():
+        if path.endswith(suffix):
+            return path[: -len(suffix)], encoding
+    return path, None
+
+
+# ---------------- Reconciliation ----------------
+async def _classify(batch, cutoff: float):
+    """Return [(path, size, reason)] orphans in one scanned batch"""
+    orphans = []
+    blob_files, legacy_files = {}, {}
+
+    for path, size, mtime in batch:
+        if mtime > cutoff:
+            continue  # may belong to an upload still in flight
+        name = os.path.basename(path)
+        if name.startswith(".tmp-") or ".tmp-" in name:
+            orphans.append((path, size, "stale temp file"))
+            continue
+
+        base, encoding = _split_variant(path)
+        if encoding and not os.path.exists(base):
+            orphans.append((path, size, "variant without original"))
+            continue
+
+        match = BLOB_FILE.match(os.path.basename(base))
+        if os.path.dirname(os.path.dirname(base)) == BLOB_DIR and match:
+            blob_files.setdefault(match.group("sha"), []).append((path, size))
+        elif not encoding:
+            legacy_files[path_to_url(path)] = (path, size)
+
+    if blob_files:
+        shas = list(blob_files)
+        referenced = set(await team_files_collection.distinct("blob_id", {"blob_id": {"$in": shas}}))
+        for sha in shas:
+            if sha not in referenced:
+                for path, size in blob_files[sha]:
+                    orphans.append((path, size, f"blob:{sha}"))
+
+    if legacy_files:
+        urls = list(legacy_files)
+        referenced = set(await team_files_collection.distinct("url", {"url": {"$in": urls}}))
+        for url in urls:
+            if url not in referenced:
+                path, size = legacy_files[url]
+                orphans.append((path, size, "no team_files record"))
+
+    return orphans
+
+
+async def _release_orphan_blob(sha: str, cutoff_at: datetime) -> bool:
+    """Drop the blob document unless an upload touched it recently"""
+    blob = await blobs_collection.find_one({"_id": sha}, {"refcount": 1, "last_acquired_at": 1})
+    if blob:
+        if blob.get("last_acquired_at") and blob["last_acquired_at"] > cutoff_at:
+            return False
+        # conditional on what we saw → loses cleanly against a concurrent upload
+        result = await blobs_collection.delete_one({
+            "_id": sha,
+            "refcount": blob.get("refcount"),
+            "last_acquired_at": blob.get("last_acquired_at"),
+        })
+        if not result.deleted_count:
+            return False
+    await file_texts_collection.delete_one({"_id": sha})
+    return True
+
+
+async def collect_orphans(dry_run: bool = True, grace_seconds: int = UPLOAD_GC_GRACE_SECONDS,
+                          max_deletes_per_second: float = UPLOAD_GC_MAX_DELETES_PER_SECOND) -> dict:
+    """Scan uploads/ in batches and report (or remove) unreferenced files"""
+    cutoff = time.time() - grace_seconds
+    cutoff_at = datetime.utcnow() - timedelta(seconds=grace_seconds)
+    limiter = RateLimiter(max_deletes_per_second)
+
+    report = {
+        "dry_run": dry_run,
+        "started_at": datetime.utcnow().isoformat(),
+        "scanned": 0,
+        "orphan_count": 0,
+        "orphan_bytes": 0,
+        "removed": 0,
+        "orphans": [],
+    }
+    released = {}
+
+    walker = _walk(UPLOAD_DIR)
+    while True:
+        batch = await asyncio.to_thread(_next_batch, walker, BATCH_SIZE)
+        if not batch:
+            break
+        report["scanned"] += len(batch)
+
+        for path, size, reason in await _classify(batch, cutoff):
+            report["orphan_count"] += 1
+            report["orphan_bytes"] += size
+            if len(report["orphans"]) < REPORT_LIMIT:
+                report["orphans"].append({"path": path, "size": size, "reason": reason})
+            if dry_run:
+                continue
+
+            if reason.startswith("blob:"):
+                sha = reason[len("blob:"):]
+                if sha not in released:
+                    released[sha] = await _release_orphan_blob(sha, cutoff_at)
+                if not released[sha]:
+                    continue
+
+            await limiter.wait()
+            await asyncio.to_thread(remove_quietly, path)
+            report["removed"] += 1
+
+        await asyncio.sleep(BATCH_PAUSE_SECONDS)
+
+    report["finished_at"] = datetime.utcnow().isoformat()
+    return report
+
+
+async def upload_gc_loop():
+    """Periodic GC, started with the app"""
+    if UPLOAD_GC_INTERVAL_SECONDS <= 0:
+        return
+    while True:
+        await asyncio.sleep(UPLOAD_GC_INTERVAL_SECONDS)
+        try:
+            report = await collect_orphans(dry_run=False)
+            print(
+                f"Upload GC: scanned={report['scanned']} orphans={report['orphan_count']} "
+                f"removed={report['removed']} bytes={report['orphan_bytes']}"
+            )
+        except Exception as e:
+            print("Upload GC failed:", e)
+
+
+if __name__ == "__main__":
+    result = asyncio.run(collect_orphans(dry_run="--apply" not in sys.argv))
+    print(json.dumps(result, indent=2))